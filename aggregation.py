@@ -0,0 +1,132 @@
+import numpy as np
+
+#quantile q of the Student t distribution with dof degrees of freedom, scipy.stats is slow to import so it is only loaded when needed
+def tQuantile(q,dof):
+    from scipy import stats
+    return stats.t.ppf(q,dof)
+
+#streaming summary of the per-step counts of many replicas: running mean and variance (Welford/Chan updates), minimum and maximum
+#of every state at every step, plus a fixed-size reservoir of whole replicas used to estimate quantiles. Memory is O(tMax)
+#whatever the number of replicas added
+class ReplicaAccumulator:
+    def __init__(self,tMax,sketchSize=100,seed=None):
+        shape=(tMax+1,3)
+        self.tMax=tMax
+        self.count=0
+        self.mean=np.zeros(shape)
+        self.m2=np.zeros(shape)
+        self.min=np.full(shape,np.inf)
+        self.max=np.full(shape,-np.inf)
+        self.sketch=np.empty((sketchSize,)+shape)
+        self.rng=np.random.default_rng(seed)
+
+    #adds the per-step counts of one replica, a list or an array of shape (tMax+1,3)
+    def add(self,data):
+        data=np.asarray(data,dtype=np.float64)
+        self.count+=1
+        delta=data-self.mean
+        self.mean+=delta/self.count
+        self.m2+=delta*(data-self.mean)
+        np.minimum(self.min,data,out=self.min)
+        np.maximum(self.max,data,out=self.max)
+        self.addToSketch(data)
+
+    #adds many replicas at once, an array of shape (R,tMax+1,3) as the one returned by batchedExperiments
+    def addBatch(self,data):
+        data=np.asarray(data,dtype=np.float64)
+        size=len(data)
+        if size==0:
+            return
+        batchMean=data.mean(axis=0)
+        batchM2=((data-batchMean)**2).sum(axis=0)
+        total=self.count+size
+        delta=batchMean-self.mean
+        self.mean+=delta*size/total
+        self.m2+=batchM2+delta**2*self.count*size/total
+        #the count is brought back to total one replica at a time by the reservoir updates below
+        np.minimum(self.min,data.min(axis=0),out=self.min)
+        np.maximum(self.max,data.max(axis=0),out=self.max)
+        for replica in data:
+            self.count+=1
+            self.addToSketch(replica)
+
+    #reservoir sampling of the replicas, self.count must already include data
+    def addToSketch(self,data):
+        if self.count<=len(self.sketch):
+            self.sketch[self.count-1]=data
+        else:
+            slot=self.rng.integers(self.count)
+            if slot<len(self.sketch):
+                self.sketch[slot]=data
+
+    #sample variance of every state at every step
+    def variance(self):
+        return self.m2/max(self.count-1,1)
+
+    #lower and upper bounds of the confidence interval of the mean at the given level (Student t)
+    def confidenceBand(self,level=0.95):
+        halfWidth=self.halfWidth(level)
+        return self.mean-halfWidth,self.mean+halfWidth
+
+    #half-width of the confidence interval of the mean at the given level
+    def halfWidth(self,level=0.95):
+        if self.count<2:
+            return np.full(self.mean.shape,np.inf)
+        return tQuantile((1+level)/2,self.count-1)*np.sqrt(self.variance()/self.count)
+
+    #approximate q-quantile of every state at every step, estimated from the reservoir
+    def quantile(self,q):
+        return np.quantile(self.sketch[:min(self.count,len(self.sketch))],q,axis=0)
+
+    #average number of nodes in state u, a, and b at each step (including the last one), in the format of averageExperiment
+    def average(self):
+        return self.mean.tolist()
+
+#builds the accumulator of the data produced by repeatedExperiments (a dictionary) or batchedExperiments (an array)
+def summarise(experimentData,tMax=None):
+    if isinstance(experimentData,dict):
+        experimentData=np.array([experimentData[n] for n in range(len(experimentData))])
+    accumulator=ReplicaAccumulator(experimentData.shape[1]-1 if tMax is None else tMax)
+    accumulator.addBatch(experimentData)
+    return accumulator
+
+#number of nodes in groupA at the last step of each replica of data, an array of shape (R,tMax+1,3)
+def finalAdoption(data):
+    return data[:,-1,1]
+
+#step with the largest number of new adoptions of each replica of data (0 if nothing was adopted)
+def peakTime(data):
+    newAdoptions=np.diff(data[:,:,1],axis=1)
+    return np.where(newAdoptions.max(axis=1,initial=0)>0,np.argmax(newAdoptions,axis=1)+1,0)
+
+#scalar metrics of the replicas that adaptiveExperiments can monitor
+METRICS={
+    'final':finalAdoption,
+    'peakTime':peakTime,
+}
+
+#smallest and largest value that each metric of METRICS can take on replicas like the ones of data
+def finalRange(data):
+    return 0,int(data[0,0].sum())
+
+def peakTimeRange(data):
+    return 0,data.shape[1]-1
+
+RANGES={
+    'final':finalRange,
+    'peakTime':peakTimeRange,
+}
+
+#bound at the given level on how far the mean of a metric with possible values in [lower,upper] can move because of outcomes not seen
+#yet: if none of the len(values) values fell outside their observed range, the probability of the outcomes outside is at most
+#-log(1-level)/len(values) (3/len(values) at 95%, the rule of three), and they are at most as far as the ends of the possible range
+def unseenHalfWidth(values,lower,upper,level=0.95):
+    if len(values)==0:
+        return np.inf
+    return -np.log(1-level)/len(values)*max(np.min(values)-lower,upper-np.max(values),0)
+
+#half-width of the confidence interval of the mean of values at the given level (Student t)
+def meanHalfWidth(values,level=0.95):
+    if len(values)<2:
+        return np.inf
+    return tQuantile((1+level)/2,len(values)-1)*np.std(values,ddof=1)/np.sqrt(len(values))
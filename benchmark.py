@@ -0,0 +1,187 @@
+import engine as en
+import experiments as exp
+import generators as gen
+import centrality as cen
+import visualizer as viz
+import layout as lay
+import numpy as np
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+#matrix of parameters of a full run and of a quick run
+MATRIX={
+    'N':[10**3,10**4,10**5,10**6],
+    'meanDegree':[1.5,4],
+    'tMax':[50],
+    'replicas':[20],
+}
+QUICK_MATRIX={
+    'N':[10**3],
+    'meanDegree':[1.5],
+    'tMax':[50],
+    'replicas':[20],
+}
+
+#seed of every graph and every run, so that all the versions time exactly the same work
+SEED=0
+
+#each case maps the parameters of a run to the function to time (the setup, e.g. building the graph, is not timed)
+#and is skipped for N larger than its limit
+def graphModelRunCase(G,N,meanDegree,tMax,replicas):
+    H=G.toNetworkx()
+    groupA,groupB=exp.fullyRandomSeeds(H,5,5,SEED)
+    return lambda: en.graphModelRun(H,tMax,groupA,groupB,0.5,writeAttributes=False,rng=np.random.default_rng(SEED))
+
+def arrayModelRunCase(G,N,meanDegree,tMax,replicas):
+    groupA,groupB=exp.fullyRandomSeeds(G,5,5,SEED)
+    return lambda: en.arrayModelRun(G,tMax,groupA,groupB,0.5,SEED)
+
+def frontierModelRunCase(G,N,meanDegree,tMax,replicas):
+    groupA,groupB=exp.fullyRandomSeeds(G,5,5,SEED)
+    return lambda: en.frontierModelRun(G,tMax,groupA,groupB,0.5,SEED)
+
+def batchedExperimentsCase(G,N,meanDegree,tMax,replicas):
+    return lambda: exp.batchedExperiments(exp.fullyRandomSeeds,G,tMax,0.5,5,5,replicas,SEED)
+
+def generateRandomSampleCase(G,N,meanDegree,tMax,replicas):
+    exclude=list(range(5))
+    def run():
+        rng=np.random.default_rng(SEED)
+        for n in range(replicas):
+            exp.generateRandomSample(G,5,exclude,rng)
+    return run
+
+def generatePowerLawGraphCase(G,N,meanDegree,tMax,replicas):
+    return lambda: exp.generatePowerLawGraph(N,2.5,SEED)
+
+def powerLawGraphCase(G,N,meanDegree,tMax,replicas):
+    return lambda: gen.powerLawGraph(N,2.5,SEED)
+
+def gnpGraphCase(G,N,meanDegree,tMax,replicas):
+    return lambda: gen.gnpGraph(N,meanDegree/N,SEED)
+
+def degreeStrategyCase(G,N,meanDegree,tMax,replicas):
+    return lambda: cen.topNodes(G,'degree',5,cen.CentralityCache())
+
+def betweennessStrategyCase(G,N,meanDegree,tMax,replicas):
+    return lambda: cen.topBetweenness(G,5,seed=SEED)
+
+def adaptiveDegreeStrategyCase(G,N,meanDegree,tMax,replicas):
+    return lambda: cen.topNodes(G,'adaptiveDegree',5,cen.CentralityCache())
+
+def adaptiveBetweennessStrategyCase(G,N,meanDegree,tMax,replicas):
+    return lambda: cen.adaptiveTopBetweenness(G,5,seed=SEED)
+
+def showGraphDynamicCase(G,N,meanDegree,tMax,replicas,mode='full'):
+    H=G.toNetworkx()
+    data,history=en.arrayModelRun(H,tMax,*exp.fullyRandomSeeds(H,5,5,SEED),0.5,SEED,history=True)
+    coordinates=np.random.default_rng(SEED).random((N,2))
+    positions={n:tuple(coordinates[i]) for i,n in enumerate(H)}
+    return lambda: viz.graphDynamicFigure(H,data,positions,"benchmark",history,mode)
+
+def showGraphDynamicDeltaCase(G,N,meanDegree,tMax,replicas):
+    return showGraphDynamicCase(G,N,meanDegree,tMax,replicas,'delta')
+
+def layoutCase(G,N,meanDegree,tMax,replicas):
+    return lambda: lay.componentLayout(G,SEED)
+
+def edgeCoordinatesCase(G,N,meanDegree,tMax,replicas):
+    coordinates=lay.componentLayout(G,SEED)
+    return lambda: lay.edgeCoordinates(G,coordinates)
+
+CASES={
+    'graphModelRun':(graphModelRunCase,10**4),
+    'arrayModelRun':(arrayModelRunCase,10**6),
+    'frontierModelRun':(frontierModelRunCase,10**6),
+    'batchedExperiments':(batchedExperimentsCase,10**6),
+    'generateRandomSample':(generateRandomSampleCase,10**6),
+    'generatePowerLawGraph':(generatePowerLawGraphCase,10**5),
+    'powerLawGraph':(powerLawGraphCase,10**6),
+    'gnpGraph':(gnpGraphCase,10**6),
+    'degreeStrategy':(degreeStrategyCase,10**6),
+    'betweennessStrategy':(betweennessStrategyCase,10**5),
+    'adaptiveDegreeStrategy':(adaptiveDegreeStrategyCase,10**6),
+    'adaptiveBetweennessStrategy':(adaptiveBetweennessStrategyCase,10**5),
+    'showGraphDynamic':(showGraphDynamicCase,10**4),
+    'showGraphDynamicDelta':(showGraphDynamicDeltaCase,10**5),
+    'layout':(layoutCase,10**6),
+    'edgeCoordinates':(edgeCoordinatesCase,10**6),
+}
+
+#times one case: best wall time over repeat runs, then the peak memory allocated by one more run (measured apart,
+#since tracing the allocations slows the run down)
+def runCase(name,parameters,repeat=3):
+    setup,limit=CASES[name]
+    G=gen.gnpGraph(parameters['N'],parameters['meanDegree']/parameters['N'],SEED)
+    run=setup(G,**parameters)
+    times=[]
+    for n in range(repeat):
+        start=time.perf_counter()
+        run()
+        times.append(time.perf_counter()-start)
+    tracemalloc.start()
+    run()
+    peak=tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return dict(parameters,case=name,seconds=min(times),peakMemory=peak)
+
+#runs every case (all of CASES by default) on every combination of matrix, returns the list of records
+def runBenchmarks(matrix=MATRIX,cases=None,repeat=3):
+    records=[]
+    names=list(matrix)
+    for combination in itertools.product(*[matrix[name] for name in names]):
+        parameters=dict(zip(names,combination))
+        for name in cases or CASES:
+            if parameters['N']>CASES[name][1]:
+                continue
+            record=runCase(name,parameters,repeat)
+            print(f"{name} {parameters}: {record['seconds']:.4f} s, {record['peakMemory']/2**20:.1f} MiB")
+            records.append(record)
+    return records
+
+#key identifying the same measure in two benchmark files
+def recordKey(record):
+    return (record['case'],record['N'],record['meanDegree'],record['tMax'],record['replicas'])
+
+#returns the records of records that are slower or use more memory than the matching record of baseline by more than threshold (0.2 is 20%)
+def compareToBaseline(records,baseline,threshold=0.2):
+    reference={recordKey(record):record for record in baseline}
+    regressions=[]
+    for record in records:
+        old=reference.get(recordKey(record))
+        if old is None:
+            continue
+        for measure in ('seconds','peakMemory'):
+            if record[measure]>old[measure]*(1+threshold):
+                regressions.append(dict(record,measure=measure,baseline=old[measure],ratio=record[measure]/old[measure]))
+    return regressions
+
+def main(arguments=None):
+    parser=argparse.ArgumentParser(description="Benchmarks of the engine, sampling, graph generation, strategies and visualization.")
+    parser.add_argument('--quick',action='store_true',help="only run the smallest configuration")
+    parser.add_argument('--cases',nargs='+',choices=list(CASES),help="cases to run (all by default)")
+    parser.add_argument('--repeat',type=int,default=3,help="timed runs of every case, the best one is kept")
+    parser.add_argument('--output',default="benchmark.json",help="JSON file the results are written to")
+    parser.add_argument('--baseline',help="JSON file of a previous run to compare against")
+    parser.add_argument('--threshold',type=float,default=0.2,help="relative slowdown or memory growth reported as a regression")
+    options=parser.parse_args(arguments)
+    records=runBenchmarks(QUICK_MATRIX if options.quick else MATRIX,options.cases,options.repeat)
+    with open(options.output,'w') as f:
+        json.dump({'python':platform.python_version(),'numpy':np.__version__,'seed':SEED,'records':records},f,indent=1)
+    print("Results written to",options.output)
+    if options.baseline:
+        with open(options.baseline) as f:
+            regressions=compareToBaseline(records,json.load(f)['records'],options.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['case']} N={regression['N']} meanDegree={regression['meanDegree']}: "
+                  f"{regression['measure']} {regression['ratio']:.2f}x the baseline")
+        return 1 if regressions else 0
+    return 0
+
+if __name__=='__main__':
+    sys.exit(main())
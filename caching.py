@@ -0,0 +1,44 @@
+import os
+import pickle
+from collections import OrderedDict
+
+#reads and writes the file of a cached value with pickle
+def loadPickle(filename):
+    with open(filename,'rb') as f:
+        return pickle.load(f)
+
+def savePickle(filename,value):
+    with open(filename,'wb') as f:
+        pickle.dump(value,f)
+
+#keeps the values computed for each key (a tuple) in memory, evicting the least recently used ones beyond maxEntries
+#if directory is given every value is also stored there on disk, in a file named after its key, and reloaded by later sessions
+#load(filename) and save(filename,value) read and write the files, whose names end with extension
+class KeyedCache:
+    def __init__(self,maxEntries=32,directory=None,extension=".pkl",load=loadPickle,save=savePickle):
+        self.maxEntries=maxEntries
+        self.directory=directory
+        self.extension=extension
+        self.load=load
+        self.save=save
+        self.entries=OrderedDict()
+
+    def path(self,key):
+        return os.path.join(self.directory,"_".join(map(str,key))+self.extension)
+
+    #returns the value of key, calling compute() only if it is neither in memory nor on disk
+    def get(self,key,compute):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        if self.directory is not None and os.path.exists(self.path(key)):
+            value=self.load(self.path(key))
+        else:
+            value=compute()
+            if self.directory is not None:
+                os.makedirs(self.directory,exist_ok=True)
+                self.save(self.path(key),value)
+        self.entries[key]=value
+        while len(self.entries)>self.maxEntries:
+            self.entries.popitem(last=False)
+        return value
@@ -0,0 +1,440 @@
+import aggregation as agg
+import caching
+import engine as en
+import parallel as par
+import networkx as nx
+import numpy as np
+import hashlib
+from scipy.sparse.linalg import eigsh
+from concurrent.futures import ProcessPoolExecutor
+
+#eigenvector centrality from the leading eigenvector of the adjacency matrix, unlike nx.eigenvector_centrality_numpy it also accepts
+#disconnected graphs (the nodes outside the component with the largest eigenvalue get a score close to 0)
+def eigenvectorCentrality(G):
+    adjacency,nodes,index=en.graphToCSR(G)
+    values,vectors=eigsh(adjacency.astype(np.float64),k=1,which='LA')
+    return dict(zip(nodes,np.abs(vectors[:,0])))
+
+#degree of every node, read from the CSR adjacency for a CSRGraph
+def degreeCentrality(G):
+    if isinstance(G,en.CSRGraph):
+        return dict(zip(G.nodes,np.diff(G.indptr).tolist()))
+    return dict(G.degree())
+
+#indexed bucket queue of the nodes by their number of neighbours (self-loops left out) that are still in the graph: order lists the
+#nodes by increasing degree, position[v] is the place of v in order and start[d] the first place of the nodes of degree d.
+#Removing a node moves each of its neighbours to the bucket below by swapping it with the first node of its bucket, so popping
+#the node of highest degree costs O(degree) instead of re-ranking all the nodes
+class DegreeBucketQueue:
+    def __init__(self,indptr,indices):
+        size=len(indptr)-1
+        rows=np.repeat(np.arange(size),np.diff(indptr))
+        degree=np.bincount(rows[rows!=indices],minlength=size)
+        #ties are popped in the order of the nodes, as in the static ranking
+        order=np.argsort(-degree,kind='stable')[::-1]
+        self.indptr=indptr.tolist()
+        self.indices=indices.tolist()
+        self.degree=degree.tolist()
+        self.order=order.tolist()
+        self.position=np.argsort(order).tolist()
+        self.start=np.searchsorted(degree[order],np.arange(degree.max(initial=0)+1)).tolist()
+        self.end=size
+        self.removed=[False]*size
+
+    def __len__(self):
+        return self.end
+
+    #removes and returns the node of highest degree, decreasing the degree of its neighbours
+    def pop(self):
+        self.end-=1
+        v=self.order[self.end]
+        self.removed[v]=True
+        for u in self.indices[self.indptr[v]:self.indptr[v+1]]:
+            if not self.removed[u]:
+                self.decrement(u)
+        return v
+
+    def decrement(self,u):
+        d=self.degree[u]
+        first=self.start[d]
+        w=self.order[first]
+        self.order[first],self.order[self.position[u]]=u,w
+        self.position[w],self.position[u]=self.position[u],first
+        self.start[d]=first+1
+        self.degree[u]=d-1
+
+#adaptive degree: the nodes are removed one at a time, each time the one with the most neighbours left. Returns a dictionary node->score
+#where the score decreases with the removal order, so the top k nodes of the ranking are the first k removed
+def adaptiveDegreeCentrality(G):
+    adjacency,nodes,index=en.graphToCSR(G)
+    queue=DegreeBucketQueue(adjacency.indptr,adjacency.indices)
+    return {nodes[queue.pop()]:len(nodes)-r for r in range(len(nodes))}
+
+#centrality measures that can be ranked, each one maps a graph to a dictionary node->score
+MEASURES={
+    'degree':degreeCentrality,
+    'adaptiveDegree':adaptiveDegreeCentrality,
+    'betweenness':nx.betweenness_centrality,
+    'eigenvector':eigenvectorCentrality,
+    'pagerank':nx.pagerank,
+}
+
+#content hash of the edge list of G: two graphs with the same nodes (in the same order) and the same edges have the same fingerprint
+#the edges are read from G itself (its CSR arrays for a CSRGraph, its adjacency dictionaries otherwise), never from a cached conversion
+def graphFingerprint(G):
+    if isinstance(G,en.CSRGraph):
+        nodes=G.nodes
+        lengths=np.diff(G.indptr)
+        indices=np.asarray(G.indices,dtype=np.int64)
+    else:
+        nodes=list(G)
+        index={n:i for i,n in enumerate(nodes)}
+        lengths=np.fromiter(map(len,G._adj.values()),dtype=np.int64,count=len(nodes))
+        indices=np.fromiter((index[m] for neighbours in G._adj.values() for m in neighbours),dtype=np.int64,count=int(lengths.sum()))
+    #the neighbours of every node are hashed in increasing order, whatever order they were added in
+    rows=np.repeat(np.arange(len(nodes)),lengths)
+    indices=indices[np.lexsort((indices,rows))]
+    digest=hashlib.sha1()
+    digest.update(repr(list(nodes)).encode())
+    digest.update(np.concatenate(([0],np.cumsum(lengths))).astype(np.int64).tobytes())
+    digest.update(indices.tobytes())
+    return digest.hexdigest()
+
+#keeps the node rankings of each (graph fingerprint, measure) pair in memory, evicting the least recently used ones beyond maxEntries
+#if directory is given every ranking is also stored there on disk and reloaded by later sessions
+class CentralityCache(caching.KeyedCache):
+    def __init__(self,maxEntries=32,directory=None):
+        super().__init__(maxEntries,directory,".pkl")
+
+    #returns all the nodes of G sorted by the given centrality measure (highest first), computing it only if it was never cached
+    def ranking(self,G,measure):
+        if measure not in MEASURES:
+            raise ValueError("Unknown centrality measure: "+str(measure))
+        def compute():
+            scores=MEASURES[measure](G)
+            return [node for node,_ in sorted(scores.items(),key=lambda x: x[1],reverse=True)]
+        return self.get((graphFingerprint(G),measure),compute)
+
+    #returns the k nodes of G with the highest centrality
+    def topNodes(self,G,measure,k):
+        return self.ranking(G,measure)[:k]
+
+#cache shared by the whole session
+defaultCache=CentralityCache()
+
+#returns the k nodes of G with the highest centrality using the given cache (the session cache by default)
+def topNodes(G,measure,k,cache=None):
+    return (cache or defaultCache).topNodes(G,measure,k)
+
+#distance from source (-1 if unreachable), number of shortest paths from source and dependency of every node on the shortest paths
+#from source (Brandes' accumulation for unweighted graphs)
+#the BFS runs one level at a time over the CSR arrays, keeping the edges of the shortest-path DAG of each level for the backward pass
+def sourcePaths(indptr,indices,source):
+    size=len(indptr)-1
+    distance=np.full(size,-1,dtype=np.int32)
+    paths=np.zeros(size)
+    distance[source]=0
+    paths[source]=1
+    #slot[w] is the position of one of the occurrences of w among the newly discovered nodes, used to deduplicate them without sorting
+    slot=np.empty(size,dtype=np.int64)
+    frontier=np.array([source])
+    levels=[]
+    d=0
+    while frontier.size:
+        u=np.repeat(frontier,indptr[frontier+1]-indptr[frontier])
+        v=en.neighbourIndices(indptr,indices,frontier)
+        discovered=v[distance[v]==-1]
+        distance[discovered]=d+1
+        onPath=distance[v]==d+1
+        u,v=u[onPath],v[onPath]
+        np.add.at(paths,v,paths[u])
+        levels.append((u,v))
+        positions=np.arange(discovered.size)
+        slot[discovered]=positions
+        frontier=discovered[slot[discovered]==positions]
+        d+=1
+    dependency=np.zeros(size)
+    for u,v in reversed(levels):
+        np.add.at(dependency,u,paths[u]/paths[v]*(1+dependency[v]))
+    dependency[source]=0
+    return distance,paths,dependency
+
+#dependencies of every node on the shortest paths from source, see sourcePaths
+def sourceDependencies(indptr,indices,source):
+    return sourcePaths(indptr,indices,source)[2]
+
+#sum of the dependencies on the given sources, used as the task of the worker processes of parallel on the graph they attached
+def dependencyChunk(sources):
+    adjacency=par.attachedGraph().adjacency
+    total=np.zeros(adjacency.shape[0])
+    for source in sources:
+        total+=sourceDependencies(adjacency.indptr,adjacency.indices,source)
+    return total
+
+#sum of the dependencies on the given sources, split in chunks across the worker pool if one is given
+def dependencySum(adjacency,sources,pool=None,workers=1):
+    if pool is None:
+        total=np.zeros(adjacency.shape[0])
+        for source in sources:
+            total+=sourceDependencies(adjacency.indptr,adjacency.indices,source)
+        return total
+    return sum(pool.map(dependencyChunk,np.array_split(sources,workers)))
+
+#normalisation of nx.betweenness_centrality for undirected graphs, estimated from sampled sources out of size nodes
+def betweennessScale(size,sampled):
+    scale=1/((size-1)*(size-2)) if size>2 else 1
+    return scale*size/sampled
+
+#exact betweenness centrality of all the nodes of G, normalised as nx.betweenness_centrality, with the sources split across worker processes
+#returns a dictionary node->score
+def exactBetweenness(G,workers=1):
+    adjacency,nodes,index=en.graphToCSR(G)
+    size=adjacency.shape[0]
+    sources=np.arange(size)
+    if workers>1:
+        blocks,spec=par.shareGraph(G)
+        try:
+            with ProcessPoolExecutor(workers,initializer=par.attachGraph,initargs=(spec,)) as pool:
+                total=dependencySum(adjacency,sources,pool,workers)
+        finally:
+            par.releaseGraph(blocks)
+    else:
+        total=dependencySum(adjacency,sources)
+    return dict(zip(nodes,total*betweennessScale(size,size)))
+
+#returns the k nodes of G with the highest betweenness, estimated from pivots sampled batchSize at a time without replacement. The mean
+#dependency of the pivots of every batch is an independent estimate of the scores, and sampling stops once, after at least minBatches
+#batches, the confidence intervals at confidence of the batch means separate the top k nodes from all the others, or after maxSamples
+#pivots. Graphs with at most maxSamples nodes use every node as a pivot, so the result is exact. Batches are split across worker processes
+#if workers>1
+def sampledTopBetweenness(G,k,batchSize=64,minBatches=4,confidence=0.99,maxSamples=1024,workers=1,seed=None):
+    adjacency,nodes,index=en.graphToCSR(G)
+    size=adjacency.shape[0]
+    pivots=np.random.default_rng(seed).permutation(size)[:maxSamples]
+    exact=len(pivots)==size
+    total=np.zeros(size)
+    squares=np.zeros(size)
+    ranking=np.arange(min(k,size))
+    batches=0
+    sampled=0
+    blocks,pool=None,None
+    if workers>1 and size:
+        blocks,spec=par.shareGraph(G)
+        pool=ProcessPoolExecutor(workers,initializer=par.attachGraph,initargs=(spec,))
+    try:
+        while sampled<len(pivots):
+            batch=pivots[sampled:sampled+batchSize]
+            batchTotal=dependencySum(adjacency,batch,pool,workers)
+            total+=batchTotal
+            squares+=(batchTotal/len(batch))**2
+            sampled+=len(batch)
+            batches+=1
+            ranking=np.argsort(-total,kind='stable')[:k]
+            if exact or batches<minBatches or k>=size:
+                continue
+            #standard error of the mean of the batch means of every node
+            mean=total/sampled
+            error=np.sqrt(np.maximum(squares/batches-mean**2,0)/(batches-1))
+            halfWidth=agg.tQuantile((1+confidence)/2,batches-1)*error
+            others=np.ones(size,dtype=bool)
+            others[ranking]=False
+            if np.min(mean[ranking]-halfWidth[ranking])>np.max(mean[others]+halfWidth[others]):
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+            par.releaseGraph(blocks)
+    return [nodes[i] for i in ranking]
+
+#returns the k nodes of G with the highest betweenness, method is 'sampled' (see sampledTopBetweenness) or 'exact'
+def topBetweenness(G,k,method='sampled',workers=1,seed=None):
+    if method=='sampled':
+        return sampledTopBetweenness(G,k,workers=workers,seed=seed)
+    if method=='exact':
+        scores=exactBetweenness(G,workers)
+        return [node for node,_ in sorted(scores.items(),key=lambda x: x[1],reverse=True)[:k]]
+    raise ValueError("Unknown betweenness method: "+str(method))
+
+#fraction of the nodes reached by a pivot that must be below the removed node for AdaptiveBetweenness to recompute the whole DAG
+#of the pivot, which is faster than updating most of it
+FULL_RECOMPUTATION=0.1
+
+#betweenness estimated from the pivots (all the nodes if samples is at least the number of nodes) of a graph from which nodes are removed
+#one at a time. The distance, number of shortest paths and dependency of every node are kept for every pivot (32 bytes per pivot and node
+#with a scratch array), an entry being addressed by the key pivot*size+node in the flattened arrays, so that removing v only recomputes
+#the region of the shortest-path DAGs at or below v. The nodes outside the region keep their distances and path counts and never get a
+#predecessor in it, so the region is recomputed from its boundary, its dependencies are accumulated again, and the only change outside is
+#the difference between the new and the old flows of dependency leaving the region, carried up to the pivots by one backward pass over
+#their ancestors. All the pivots are processed together
+class AdaptiveBetweenness:
+    def __init__(self,G,samples=256,seed=None):
+        adjacency,nodes,index=en.graphToCSR(G)
+        self.nodes=nodes
+        self.indptr=adjacency.indptr
+        self.indices=adjacency.indices
+        self.size=len(nodes)
+        self.pivots=np.random.default_rng(seed).permutation(self.size)[:samples]
+        self.distance=np.empty((len(self.pivots),self.size),dtype=np.int32)
+        self.paths=np.empty((len(self.pivots),self.size))
+        self.dependency=np.empty((len(self.pivots),self.size))
+        for r,source in enumerate(self.pivots):
+            self.distance[r],self.paths[r],self.dependency[r]=sourcePaths(self.indptr,self.indices,source)
+        self.total=self.dependency.sum(axis=0)
+        self.removed=np.zeros(self.size,dtype=bool)
+        self.slot=np.empty(self.distance.size,dtype=np.int64)
+
+    #distinct entries of keys and the position of each entry of keys among them, without sorting (see sourcePaths)
+    def unique(self,keys):
+        positions=np.arange(keys.size)
+        self.slot[keys]=positions
+        first=keys[self.slot[keys]==positions]
+        self.slot[first]=np.arange(first.size)
+        return first,self.slot[keys]
+
+    #which of the candidates are among the distinct keys
+    def contains(self,keys,candidates):
+        if keys.size==0:
+            return np.zeros(candidates.size,dtype=bool)
+        self.slot[keys]=np.arange(keys.size)
+        return keys[np.clip(self.slot[candidates],0,keys.size-1)]==candidates
+
+    #edges from the entries keys to the neighbours still in the graph, as the positions of their owner in keys and the neighbour keys
+    def edges(self,keys):
+        rows=keys%self.size
+        lengths=self.indptr[rows+1]-self.indptr[rows]
+        owner=np.repeat(np.arange(keys.size),lengths)
+        neighbours=en.neighbourIndices(self.indptr,self.indices,rows)
+        kept=~self.removed[neighbours]
+        return owner[kept],neighbours[kept]+(keys-rows)[owner[kept]]
+
+    #entries under the given ones in the DAGs, i.e. the nodes with at least one shortest path from the pivot through them
+    def descendants(self,keys):
+        distance=self.distance.ravel()
+        levels=[keys[:0]]
+        while keys.size:
+            owner,neighbours=self.edges(keys)
+            keys=self.unique(neighbours[distance[neighbours]==distance[keys[owner]]+1])[0]
+            levels.append(keys)
+        return np.concatenate(levels)
+
+    #Brandes' backward pass from the given targets, whose dependencies must be zero, and from the given flows of dependency into
+    #other entries: the dependencies of all the entries reached are updated, and the sum of their changes over the pivots is returned
+    def accumulate(self,targets,flowKeys,flowValues):
+        distance,paths,dependency=self.distance.ravel(),self.paths.ravel(),self.dependency.ravel()
+        total=np.zeros(self.size)
+        #entries waiting at each distance, with the dependency they received and their weight as a target
+        pending={}
+        for keys,values,weight in ((targets,np.zeros(targets.size),np.ones(targets.size)),(flowKeys,flowValues,np.zeros(flowKeys.size))):
+            for d in np.unique(distance[keys]):
+                level=distance[keys]==d
+                pending.setdefault(int(d),[]).append((keys[level],values[level],weight[level]))
+        for d in range(max(pending,default=0),0,-1):
+            if d not in pending:
+                continue
+            keys,accumulated,weight=map(np.concatenate,zip(*pending.pop(d)))
+            keys,inverse=self.unique(keys)
+            accumulated=np.bincount(inverse,accumulated,keys.size)
+            weight=np.minimum(np.bincount(inverse,weight,keys.size),1)
+            dependency[keys]+=accumulated
+            total+=np.bincount(keys%self.size,accumulated,self.size)
+            owner,neighbours=self.edges(keys)
+            onPath=distance[neighbours]==d-1
+            owner,neighbours=owner[onPath],neighbours[onPath]
+            contribution=paths[neighbours]/paths[keys[owner]]*(weight[owner]+accumulated[owner])
+            pending.setdefault(d-1,[]).append((neighbours,contribution,np.zeros(neighbours.size)))
+        return total
+
+    #distances and numbers of shortest paths of the given entries once v is removed, earliest being the distance at which each of them
+    #is first reached from outside: a BFS over the entries starts from each of them at that distance. The neighbours of the entries are
+    #all reachable from the pivot, so the ones at distance -1 are the entries not reached yet. Returns the entries still reachable
+    def recompute(self,keys,earliest):
+        distance,paths=self.distance.ravel(),self.paths.ravel()
+        distance[keys]=-1
+        paths[keys]=0
+        never=np.iinfo(np.int32).max
+        order=np.argsort(earliest,kind='stable')
+        earliest=earliest[order]
+        levels=[]
+        frontier=keys[:0]
+        d=earliest[0] if keys.size else never
+        while d<never:
+            entering=order[np.searchsorted(earliest,d):np.searchsorted(earliest,d,side='right')]
+            frontier=self.unique(np.concatenate([frontier,keys[entering]]))[0]
+            frontier=frontier[distance[frontier]==-1]
+            if frontier.size==0:
+                later=np.searchsorted(earliest,d,side='right')
+                d=earliest[later] if later<keys.size else never
+                continue
+            distance[frontier]=d
+            levels.append((frontier,d))
+            owner,neighbours=self.edges(frontier)
+            frontier=neighbours[distance[neighbours]==-1]
+            d+=1
+        for level,d in levels:
+            owner,neighbours=self.edges(level)
+            onPath=distance[neighbours]==d-1
+            np.add.at(paths,level[owner[onPath]],paths[neighbours[onPath]])
+        return keys[distance[keys]>=0]
+
+    #CSR arrays of the graph without the removed nodes
+    def remaining(self):
+        rows=np.repeat(np.arange(self.size),np.diff(self.indptr))
+        kept=~self.removed[rows]&~self.removed[self.indices]
+        return np.concatenate(([0],np.cumsum(np.bincount(rows[kept],minlength=self.size)))),self.indices[kept]
+
+    #removes row v from the graph and updates the betweenness of the other nodes
+    def remove(self,v):
+        distance,paths,dependency=self.distance.ravel(),self.paths.ravel(),self.dependency.ravel()
+        #a removed pivot takes its dependencies away and stops counting
+        for r in np.flatnonzero(self.pivots==v):
+            self.total-=self.dependency[r]
+            self.dependency[r]=0
+            self.distance[r]=-1
+        #the pivots with a large part of their nodes below v (the dependency of v is at most the number of nodes below it,
+        #and equal to it on trees) run a new BFS over the graph left instead
+        reached=self.distance[:,v]>=0
+        full=np.flatnonzero(reached&(self.dependency[:,v]>FULL_RECOMPUTATION*(self.distance>=0).sum(axis=1)))
+        if full.size:
+            self.removed[v]=True
+            indptr,indices=self.remaining()
+            for r in full:
+                self.total-=self.dependency[r]
+                self.distance[r],self.paths[r],self.dependency[r]=sourcePaths(indptr,indices,self.pivots[r])
+                self.total+=self.dependency[r]
+            self.removed[v]=False
+            reached[full]=False
+        starts=np.flatnonzero(reached)*self.size+v
+        below=self.descendants(starts)
+        region=np.concatenate([starts,below])
+        #old flows leaving the region and earliest distance at which every entry below v is reached from outside once v is removed
+        owner,neighbours=self.edges(region)
+        outside=~self.contains(region,neighbours)
+        onPath=outside&(distance[neighbours]==distance[region[owner]]-1)
+        inner=region[owner[onPath]]
+        flowKeys=neighbours[onPath]
+        flowValues=-paths[flowKeys]/paths[inner]*(1+dependency[inner])
+        entry=outside&(owner>=starts.size)
+        earliest=np.full(below.size,np.iinfo(np.int32).max)
+        np.minimum.at(earliest,owner[entry]-starts.size,distance[neighbours[entry]]+1)
+        self.total-=np.bincount(region%self.size,dependency[region],self.size)
+        dependency[region]=0
+        self.removed[v]=True
+        self.total+=self.accumulate(self.recompute(below,earliest),flowKeys,flowValues)
+        self.distance[:,v]=-1
+        self.paths[:,v]=0
+        self.total[v]=0
+
+    #row of the node of highest betweenness still in the graph
+    def top(self):
+        return int(np.argmax(np.where(self.removed,-np.inf,self.total)))
+
+#adaptive betweenness: returns k nodes of G removed one at a time, each time the one of highest betweenness in the graph left,
+#estimated from samples pivots (see AdaptiveBetweenness)
+def adaptiveTopBetweenness(G,k,samples=256,seed=None):
+    state=AdaptiveBetweenness(G,samples,seed)
+    chosen=[]
+    for i in range(min(k,len(state.nodes))):
+        v=state.top()
+        state.remove(v)
+        chosen.append(state.nodes[v])
+    return chosen
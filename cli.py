@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import sys
+
+#command-line driver running the scenarios of a JSON configuration file (see scenarios.json), e.g.
+#    python cli.py run scenarios.json
+#    python cli.py report scenarios.json
+#    python cli.py sweep scenarios.json
+#    python cli.py ensemble scenarios.json
+#    python cli.py threshold scenarios.json
+#every module is imported by the subcommand that needs it: running scenarios never loads plotly or matplotlib,
+#and networkx/centrality are only loaded for the centrality-based strategies
+
+#value of every option of a scenario that is not given in the configuration file or in its 'defaults' section
+DEFAULTS={
+    'tMax':50,
+    'probability':0.5,
+    'sizeGroupA':5,
+    'sizeGroupB':5,
+    'strategy':'random',
+    'replicas':100,
+    'targetHalfWidth':None,
+    'maxReplicas':500,
+    'seed':0,
+}
+
+def readConfig(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+#options of every scenario of config, completed with the defaults of the file and then with DEFAULTS
+def scenarioOptions(config):
+    scenarios=[]
+    for scenario in config['scenarios']:
+        options=dict(DEFAULTS)
+        options.update(config.get('defaults',{}))
+        options.update(scenario)
+        scenarios.append(options)
+    return scenarios
+
+def resultPath(config,name):
+    return os.path.join(config.get('output',"results"),name+".npz")
+
+#loads (or generates and stores, see graphstore.cachedGraph) the graphs of the configuration file
+def loadGraphs(config):
+    import graphstore as gs
+    directory=config.get('graphDirectory',"graphs")
+    return {name:gs.cachedGraph(os.path.join(directory,name+".csr"),graph['generator'],graph['parameters'],graph.get('seed',0))
+            for name,graph in config['graphs'].items()}
+
+#seeds function and its two arguments (see experiments.batchedExperiments) drawing the groups of the strategy of a scenario on G
+#the strategy is seeded from a child of the seed of the scenario, so the vaccinated nodes are reproducible and independent of the runs
+def scenarioSeeds(G,options):
+    import experiments as exp
+    import numpy as np
+    import sweep
+    if options['strategy'] not in sweep.STRATEGIES:
+        raise ValueError("Unknown strategy: "+str(options['strategy']))
+    strategy=sweep.STRATEGIES[options['strategy']]
+    if strategy is None:
+        return exp.fullyRandomSeeds,options['sizeGroupA'],options['sizeGroupB']
+    return exp.halfRandomSeedsB,strategy(G,options['sizeGroupB'],np.random.SeedSequence(options['seed']).spawn(1)[0]),options['sizeGroupA']
+
+#runs one scenario on G: a fixed number of replicas, or replicas added until the half-widths of targetHalfWidth are reached
+#returns the accumulator of the replicas
+def runScenario(G,options):
+    import experiments as exp
+    import aggregation as agg
+    seeds,forth,fifth=scenarioSeeds(G,options)
+    if options['targetHalfWidth'] is None:
+        return agg.summarise(exp.batchedExperiments(seeds,G,options['tMax'],options['probability'],forth,fifth,options['replicas'],options['seed']))
+    accumulator,report=exp.adaptiveExperiments(seeds,G,options['tMax'],options['probability'],forth,fifth,options['targetHalfWidth'],
+                                               runner=exp.batchedExperiments,maxReplicas=options['maxReplicas'],seed=options['seed'])
+    return accumulator
+
+#'run': runs every scenario (or the selected ones) and stores its mean and confidence half-width in the output directory
+def runCommand(arguments):
+    import numpy as np
+    config=readConfig(arguments.config)
+    graphs=loadGraphs(config)
+    os.makedirs(config.get('output',"results"),exist_ok=True)
+    for options in scenarioOptions(config):
+        if arguments.scenarios and options['name'] not in arguments.scenarios:
+            continue
+        accumulator=runScenario(graphs[options['graph']],options)
+        np.savez(resultPath(config,options['name']),average=accumulator.mean,halfWidth=accumulator.halfWidth(),
+                 replicas=accumulator.count,options=json.dumps(options))
+        print("Scenario:",options['name'],"done with",accumulator.count,"replicas.")
+    return 0
+
+#'report': writes the animated plot of every stored scenario (visualizer.exportData) and a bar chart of the final adoption
+def reportCommand(arguments):
+    import numpy as np
+    import visualizer as viz
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    config=readConfig(arguments.config)
+    names,averages,halfWidths=[],{},[]
+    for options in scenarioOptions(config):
+        if not os.path.exists(resultPath(config,options['name'])):
+            print("Scenario:",options['name'],"not run yet.")
+            continue
+        with np.load(resultPath(config,options['name'])) as stored:
+            names.append(options['name'])
+            averages[options['name']]=stored['average'].tolist()
+            halfWidths.append(stored['halfWidth'][-1,1])
+    viz.exportData({os.path.join(config.get('output',"results"),name):averages[name] for name in names},workers=arguments.workers)
+    fig,ax=plt.subplots(figsize=(12,6))
+    ax.bar(range(len(names)),[averages[name][-1][1] for name in names],yerr=halfWidths,capsize=4,color='steelblue')
+    ax.set_xticks(range(len(names)))
+    ax.set_xticklabels(names,rotation=30,ha='right')
+    ax.set_ylabel('Number of Infected Nodes')
+    ax.set_title('Final Infection Count by Scenario')
+    fig.tight_layout()
+    fig.savefig(os.path.join(config.get('output',"results"),"Final_Infection_Comparison.png"),dpi=150)
+    print("Report written to",config.get('output',"results"))
+    return 0
+
+#'sweep': runs the parameter sweep of the 'sweep' section of the configuration file, see sweep.runSweep
+def sweepCommand(arguments):
+    import sweep
+    config=readConfig(arguments.config)['sweep']
+    sweep.runSweep(config['grid'],config.get('directory',"sweep"),config.get('tMax',50),config.get('replicas',20),
+                   config.get('seed',0),arguments.workers or config.get('workers',1))
+    return 0
+
+#'ensemble': runs the strategies of the 'ensemble' section of the configuration file on many realizations of each of its graphs
+#(see ensemble.ensembleExperiments) and stores, for every strategy, the mean trajectory of each realization and of the whole ensemble
+def ensembleCommand(arguments):
+    import ensemble as ens
+    import numpy as np
+    config=readConfig(arguments.config)
+    options=dict(DEFAULTS)
+    options.update(config.get('defaults',{}))
+    options.update(config['ensemble'])
+    os.makedirs(config.get('output',"results"),exist_ok=True)
+    for name in options['graphs']:
+        perRealization,ensemble=ens.ensembleExperiments(config['graphs'][name],options['strategies'],options['realizations'],
+                                                        options['tMax'],options['probability'],options['sizeGroupA'],options['sizeGroupB'],
+                                                        options['replicas'],options['seed'],options.get('producers',1),arguments.workers)
+        arrays={}
+        for strategy,accumulator in ensemble.items():
+            arrays[strategy+"_average"]=accumulator.realizations.mean
+            arrays[strategy+"_halfWidth"]=accumulator.realizations.halfWidth()
+            arrays[strategy+"_realizations"]=np.array([realization[strategy].mean for realization in perRealization])
+            final=accumulator.report()['final']
+            print("Ensemble:",name,strategy,"final adoption:",round(final['mean'],1),"+/-",round(final['halfWidth'],1),
+                  "between-graph sd:",round(np.sqrt(final['betweenVariance']),1),"within-graph sd:",round(np.sqrt(final['withinVariance']),1))
+        np.savez(resultPath(config,"Ensemble_"+name),report=json.dumps({strategy:accumulator.report() for strategy,accumulator in ensemble.items()}),
+                 options=json.dumps(options),**arrays)
+    return 0
+
+#'threshold': finds the transmission probability at which groupA takes over the graph of every scenario (or of the selected ones)
+#with the criterion of the 'threshold' section of the configuration file (see threshold.findThreshold), and stores them in thresholds.json
+def thresholdCommand(arguments):
+    import threshold as th
+    config=readConfig(arguments.config)
+    criterion=config.get('threshold',{})
+    graphs=loadGraphs(config)
+    os.makedirs(config.get('output',"results"),exist_ok=True)
+    results={}
+    for options in scenarioOptions(config):
+        if arguments.scenarios and options['name'] not in arguments.scenarios:
+            continue
+        G=graphs[options['graph']]
+        seeds,forth,fifth=scenarioSeeds(G,options)
+        report=th.findThreshold(seeds,G,options['tMax'],forth,fifth,seed=options['seed'],**criterion)
+        del report['brackets']
+        results[options['name']]=report
+        print("Scenario:",options['name'],"threshold:",round(report['threshold'],4),"interval:",(round(report['lower'],4),round(report['upper'],4)),
+              "runs:",report['runs'])
+    with open(os.path.join(config.get('output',"results"),"thresholds.json"),'w') as f:
+        json.dump(results,f,indent=1)
+    return 0
+
+def main(arguments=None):
+    parser=argparse.ArgumentParser(description="Runs the vaccination experiments described by a JSON configuration file.")
+    subparsers=parser.add_subparsers(dest='command',required=True)
+    run=subparsers.add_parser('run',help="run the scenarios and store their results")
+    run.add_argument('config')
+    run.add_argument('scenarios',nargs='*',help="names of the scenarios to run (all by default)")
+    run.set_defaults(function=runCommand)
+    report=subparsers.add_parser('report',help="plot the stored results of the scenarios")
+    report.add_argument('config')
+    report.add_argument('--workers',type=int,default=None,help="processes writing the plots (all the cores by default)")
+    report.set_defaults(function=reportCommand)
+    sweepParser=subparsers.add_parser('sweep',help="run the parameter sweep of the configuration file")
+    sweepParser.add_argument('config')
+    sweepParser.add_argument('--workers',type=int,default=None)
+    sweepParser.set_defaults(function=sweepCommand)
+    ensembleParser=subparsers.add_parser('ensemble',help="run the strategies on many realizations of the graphs")
+    ensembleParser.add_argument('config')
+    ensembleParser.add_argument('--workers',type=int,default=None,help="processes running the strategies (all the other cores by default)")
+    ensembleParser.set_defaults(function=ensembleCommand)
+    thresholdParser=subparsers.add_parser('threshold',help="find the transmission probability at which groupA takes over")
+    thresholdParser.add_argument('config')
+    thresholdParser.add_argument('scenarios',nargs='*',help="names of the scenarios (all by default)")
+    thresholdParser.set_defaults(function=thresholdCommand)
+    arguments=parser.parse_args(arguments)
+    return arguments.function(arguments)
+
+if __name__=='__main__':
+    sys.exit(main())
@@ -1,48 +1,366 @@
-import networkx as nx
 import random
+import weakref
+import time
+import instrumentation as ins
+import numpy as np
+from scipy.sparse import csr_array
+#networkx is only imported by the functions that need it, the array engines run on a CSRGraph without it
 
-def graphModelRun(G,tMax,groupA,groupB,p):
+#the three states in our system u=undecided, a=groupA, and b=groupB
+UNDECIDED=0
+GROUP_A=1
+GROUP_B=2
+
+#values of the adoption time of a node that never adopted A and of a node in groupB
+NEVER_ADOPTED=int(np.iinfo(np.int32).max)
+IN_GROUP_B=-1
+
+#cache of the CSR adjacency of each graph, dropped automatically when the graph is garbage collected
+_adjacencyCache=weakref.WeakKeyDictionary()
+
+#compact history of a run: times[i] is the step at which nodes[i] adopted A (0 for groupA), NEVER_ADOPTED if it never did
+#and IN_GROUP_B for the nodes in groupB. The state of the nodes at any step is rebuilt lazily from this single int32 vector
+class AdoptionHistory:
+    def __init__(self,nodes,times,tMax):
+        self.nodes=nodes
+        self.times=times
+        self.tMax=tMax
+
+    #builds the history from the 'adopted' node attribute written by graphModelRun
+    @classmethod
+    def fromGraph(cls,G,tMax):
+        nodes=list(G)
+        times=np.array([G.nodes[n]['adopted'] for n in nodes],dtype=np.int32)
+        return cls(nodes,times,tMax)
+
+    #number of steps stored, including the initial state
+    def __len__(self):
+        return self.tMax+1
+
+    #returns the int8 vector of the states of the nodes at step t
+    def stateAt(self,t):
+        state=np.where(self.times<=t,GROUP_A,UNDECIDED).astype(np.int8)
+        state[self.times==IN_GROUP_B]=GROUP_B
+        return state
+
+    #returns the number of nodes in state u, a, and b at each step, as returned by the engines
+    def counts(self):
+        adopted=np.bincount(self.times[(self.times>=0)&(self.times<=self.tMax)],minlength=self.tMax+1).cumsum()
+        inGroupB=int(np.count_nonzero(self.times==IN_GROUP_B))
+        undecided=len(self.nodes)-inGroupB-adopted
+        return [[int(undecided[t]),int(adopted[t]),inGroupB] for t in range(self.tMax+1)]
+
+#reference implementation of the dynamics, one neighbour at a time with the random number generator rng (the random module by default)
+#G is only read unless writeAttributes is True, in which case the adoption time of every node is stored in its 'adopted' attribute
+#as expected by AdoptionHistory.fromGraph. If history is True it returns the pair (data,AdoptionHistory of the run)
+#every engine reports its per-step counters to probe (an instrumentation.Probe), by default to the one of instrumentation.profile() if any
+def graphModelRun(G,tMax,groupA,groupB,p,writeAttributes=True,history=False,rng=random,probe=None):
+    if probe is None:
+        probe=ins.activeProbe()
     #output data list
     data=[]
     #the three states in our system u=undecided, a=groupA, and b=groupB
     u=0
     a=1
     b=2
-    initState={}
-    #add the state attribute the the nodes of the graph
-    for n in G:
-        initState.update({n:{'state':[]}})
-    nx.set_node_attributes(G,initState)
-    #initialise the dynamics of the graph
+    #initialise the dynamics of the graph, every node only stores the step at which it adopted A
+    #(see AdoptionHistory) so the state of m at step t is a exactly when 0<=adopted[m]<=t
+    adopted={}
     nodesInState={u:0,a:0,b:0}    
     for n in G:
       if n in groupA:
-           G.nodes[n]['state'].append(a)
+           adopted[n]=0
            nodesInState[a]+=1   
       elif n in groupB:
-          G.nodes[n]['state'].append(b)
+          adopted[n]=IN_GROUP_B
           nodesInState[b]+=1                    
       else:
-          G.nodes[n]['state'].append(u)
+          adopted[n]=NEVER_ADOPTED
           nodesInState[u]+=1  
     data.append([nodesInState[u],nodesInState[a],nodesInState[b]])   
     #computes the state of each node at each step of the simulation    
     for t in range(tMax):
-            for n in G:
-                done=False
-                if G.nodes[n]['state'][t]==u:
-                    for m in G[n]:
-                        if done:
-                            break
-                        if G.nodes[m]['state'][t]==a:
-                            if random.random()<p:
-                                G.nodes[n]['state'].append(a)
-                                nodesInState[a]+=1
-                                done=True
-                if not done:
-                    G.nodes[n]['state'].append(G.nodes[n]['state'][t])
-                else:
-                    if G.nodes[n]['state'][t]==u:
-                        nodesInState[u]-=1
+            if probe is None:
+                for n in G:
+                    if adopted[n]==NEVER_ADOPTED:
+                        for m in G[n]:
+                            if 0<=adopted[m]<=t:
+                                if rng.random()<p:
+                                    adopted[n]=t+1
+                                    nodesInState[a]+=1
+                                    nodesInState[u]-=1
+                                    break
+            else:
+                #same loop counting the neighbours scanned and the random draws, only run when a probe is listening
+                start=time.perf_counter()
+                scanned=draws=0
+                for n in G:
+                    if adopted[n]==NEVER_ADOPTED:
+                        for m in G[n]:
+                            scanned+=1
+                            if 0<=adopted[m]<=t:
+                                draws+=1
+                                if rng.random()<p:
+                                    adopted[n]=t+1
+                                    nodesInState[a]+=1
+                                    nodesInState[u]-=1
+                                    break
+                probe.step('graph',t,time.perf_counter()-start,scanned,draws,nodesInState[a]-data[-1][a])
             data.append([nodesInState[u],nodesInState[a],nodesInState[b]])
-    return data
\ No newline at end of file
+    if writeAttributes:
+        import networkx as nx
+        nx.set_node_attributes(G,adopted,'adopted')
+    if history:
+        nodes=list(adopted)
+        return data,AdoptionHistory(nodes,np.array([adopted[n] for n in nodes],dtype=np.int32),tMax)
+    return data
+
+#graph stored only as its CSR adjacency (row i lists the neighbours of nodes[i]), the array engines accept it in place of a networkx graph
+#if nodes is None the nodes are the integers 0..N-1 and no node->row dictionary is built. data defaults to unit entries
+#metadata describes how the graph was made (see graphstore) and filename is the file it is mapped from, if any
+class CSRGraph:
+    def __init__(self,indptr,indices,nodes=None,data=None,metadata=None,filename=None):
+        size=len(indptr)-1
+        self.metadata=metadata or {}
+        self.filename=filename
+        if data is None:
+            data=np.ones(len(indices),dtype=np.int32)
+        self.indptr=indptr
+        self.indices=indices
+        self.adjacency=csr_array((data,indices,indptr),shape=(size,size),copy=False)
+        if nodes is None:
+            self.nodes=range(size)
+            self.index=range(size)
+        else:
+            self.nodes=list(nodes)
+            self.index={n:i for i,n in enumerate(self.nodes)}
+
+    #builds the CSR graph of the networkx graph G
+    @classmethod
+    def fromGraph(cls,G):
+        adjacency,nodes,index=graphToCSR(G)
+        return cls(adjacency.indptr,adjacency.indices,nodes,adjacency.data)
+
+    #returns the networkx graph with the same nodes and edges, for the code that needs networkx (centrality, visualizer)
+    def toNetworkx(self):
+        import networkx as nx
+        G=nx.Graph()
+        G.add_nodes_from(self.nodes)
+        rows=np.repeat(np.arange(len(self.nodes)),np.diff(self.indptr))
+        upper=rows<=self.indices
+        G.add_edges_from(zip([self.nodes[i] for i in rows[upper].tolist()],[self.nodes[i] for i in self.indices[upper].tolist()]))
+        return G
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __contains__(self,n):
+        return n in self.index
+
+#in-memory key of the adjacency of the networkx graph G, it changes whenever a node or an edge is added or removed, including rewirings
+#that keep the number of edges. Hashing the neighbour tuples costs about a tenth of the conversion done by graphToCSR
+def adjacencyKey(G):
+    return hash((tuple(G._adj),tuple(map(tuple,G._adj.values()))))
+
+#returns the adjacency of G as a CSR matrix with unit entries (parallel edges collapsed), the list of nodes in matrix order and the node->row dictionary
+#the result is cached per graph and recomputed whenever the nodes or the edges of G change (see adjacencyKey)
+def graphToCSR(G):
+    if isinstance(G,CSRGraph):
+        return G.adjacency,G.nodes,G.index
+    key=adjacencyKey(G)
+    cached=_adjacencyCache.get(G)
+    if cached is not None and cached[0]==key:
+        return cached[1]
+    import networkx as nx
+    nodes=list(G)
+    #networkx refuses to convert a graph without nodes
+    adjacency=nx.to_scipy_sparse_array(G,nodelist=nodes,format='csr',weight=None,dtype=np.int32) if nodes else csr_array((0,0),dtype=np.int32)
+    adjacency.data[:]=1
+    index={n:i for i,n in enumerate(nodes)}
+    _adjacencyCache[G]=(key,(adjacency,nodes,index))
+    return adjacency,nodes,index
+
+#builds the int8 state vector of the nodes of the graph, nodes in both groups are assigned to groupA as in graphModelRun
+def initialState(index,groupA,groupB):
+    state=np.full(len(index),UNDECIDED,dtype=np.int8)
+    state[[index[n] for n in groupB if n in index]]=GROUP_B
+    state[[index[n] for n in groupA if n in index]]=GROUP_A
+    return state
+
+#adoption times of the initial state: 0 for groupA, IN_GROUP_B for groupB and NEVER_ADOPTED for the undecided nodes
+def initialTimes(state):
+    times=np.full(state.size,NEVER_ADOPTED,dtype=np.int32)
+    times[state==GROUP_A]=0
+    times[state==GROUP_B]=IN_GROUP_B
+    return times
+
+#probability that an undecided node with k neighbours in groupA adopts A in one step, for k=0..maxDegree
+def adoptionProbabilities(p,maxDegree):
+    return 1-(1-p)**np.arange(maxDegree+1)
+
+#same dynamics and output of graphModelRun, but the state is kept in a NumPy vector and every step is a single sparse product:
+#an undecided node with k neighbours in groupA adopts A with probability 1-(1-p)^k, which is exactly the chance that one of the k
+#independent trials of graphModelRun succeeds. seed is anything accepted by np.random.default_rng
+#if history is True it returns the pair (data,AdoptionHistory of the run)
+def arrayModelRun(G,tMax,groupA,groupB,p,seed=None,history=False,probe=None):
+    if probe is None:
+        probe=ins.activeProbe()
+    rng=np.random.default_rng(seed)
+    adjacency,nodes,index=graphToCSR(G)
+    state=initialState(index,groupA,groupB)
+    degrees=np.diff(adjacency.indptr)
+    probabilities=adoptionProbabilities(p,int(degrees.max(initial=0)))
+    data=np.empty((tMax+1,3),dtype=np.int64)
+    data[0]=np.bincount(state,minlength=3)
+    times=initialTimes(state) if history else None
+    adopted=None
+    for t in range(tMax):
+        start=time.perf_counter() if probe is not None else 0
+        scanned=0
+        #number of neighbours in groupA of each node at time t, recomputed only if the state changed in the previous step
+        if adopted is None or adopted.size:
+            scanned=adjacency.nnz
+            k=adjacency@(state==GROUP_A).astype(np.int32)
+            candidates=np.flatnonzero(k)
+            candidates=candidates[state[candidates]==UNDECIDED]
+            candidateProbabilities=probabilities[k[candidates]]
+        #no undecided node is next to groupA, the state is frozen for the rest of the run
+        if candidates.size==0:
+            if probe is not None:
+                probe.step('array',t,time.perf_counter()-start,scanned,0,0)
+            data[t+1:]=data[t]
+            break
+        adopted=candidates[rng.random(candidates.size)<candidateProbabilities]
+        state[adopted]=GROUP_A
+        if history:
+            times[adopted]=t+1
+        if probe is not None:
+            probe.step('array',t,time.perf_counter()-start,scanned,candidates.size,adopted.size)
+        data[t+1]=data[t]
+        data[t+1,UNDECIDED]-=adopted.size
+        data[t+1,GROUP_A]+=adopted.size
+    if history:
+        return data.tolist(),AdoptionHistory(nodes,times,tMax)
+    return data.tolist()
+
+#runs R independent replicas of the dynamics of arrayModelRun on G at the same time, groupsA[r] and groupsB[r] are the initial groups of replica r
+#the state is an NxR matrix so the neighbour counts of all replicas are a single sparse-dense product per step
+#returns an array of shape (R,tMax+1,3) with the number of nodes in state u, a, and b of each replica at each step
+def batchModelRun(G,tMax,groupsA,groupsB,p,seed=None,probe=None):
+    if probe is None:
+        probe=ins.activeProbe()
+    rng=np.random.default_rng(seed)
+    adjacency,nodes,index=graphToCSR(G)
+    replicas=len(groupsA)
+    state=np.empty((len(nodes),replicas),dtype=np.int8)
+    for r in range(replicas):
+        state[:,r]=initialState(index,groupsA[r],groupsB[r])
+    degrees=np.diff(adjacency.indptr)
+    probabilities=adoptionProbabilities(p,int(degrees.max(initial=0)))
+    data=np.empty((replicas,tMax+1,3),dtype=np.int64)
+    for r in range(replicas):
+        data[r,0]=np.bincount(state[:,r],minlength=3)
+    adopted=None
+    for t in range(tMax):
+        start=time.perf_counter() if probe is not None else 0
+        scanned=0
+        #neighbours in groupA of every node in every replica, recomputed only if some replica changed in the previous step
+        if adopted is None or adopted.any():
+            scanned=adjacency.nnz*replicas
+            k=adjacency@(state==GROUP_A).astype(np.int32)
+            rows,cols=np.nonzero(k)
+            undecided=state[rows,cols]==UNDECIDED
+            rows,cols=rows[undecided],cols[undecided]
+            candidateProbabilities=probabilities[k[rows,cols]]
+        if rows.size==0:
+            if probe is not None:
+                probe.step('batch',t,time.perf_counter()-start,scanned,0,0)
+            data[:,t+1:]=data[:,t,None]
+            break
+        success=rng.random(rows.size)<candidateProbabilities
+        state[rows[success],cols[success]]=GROUP_A
+        adopted=np.bincount(cols[success],minlength=replicas)
+        if probe is not None:
+            probe.step('batch',t,time.perf_counter()-start,scanned,rows.size,adopted.sum())
+        data[:,t+1]=data[:,t]
+        data[:,t+1,UNDECIDED]-=adopted
+        data[:,t+1,GROUP_A]+=adopted
+    return data
+
+#returns the concatenated CSR neighbour lists of the given rows
+def neighbourIndices(indptr,indices,rows):
+    starts=indptr[rows]
+    lengths=indptr[rows+1]-starts
+    offsets=np.repeat(starts-np.cumsum(lengths)+lengths,lengths)
+    return indices[offsets+np.arange(lengths.sum())]
+
+#same dynamics and output of arrayModelRun, but every step only visits the frontier, i.e. the undecided nodes with at least one neighbour in groupA
+#the neighbour counts are updated incrementally from the nodes that adopted A in the previous step, and once the frontier is empty
+#(or p is 0) the state can no longer change, so the rest of the trajectory is filled with the last counts without simulating it
+def frontierModelRun(G,tMax,groupA,groupB,p,seed=None,history=False,probe=None):
+    if probe is None:
+        probe=ins.activeProbe()
+    rng=np.random.default_rng(seed)
+    adjacency,nodes,index=graphToCSR(G)
+    indptr,indices=adjacency.indptr,adjacency.indices
+    state=initialState(index,groupA,groupB)
+    degrees=np.diff(indptr)
+    probabilities=adoptionProbabilities(p,int(degrees.max(initial=0)))
+    k=np.zeros(len(nodes),dtype=np.int32)
+    frontier=np.empty(0,dtype=indices.dtype)
+    data=np.empty((tMax+1,3),dtype=np.int64)
+    data[0]=np.bincount(state,minlength=3)
+    times=initialTimes(state) if history else None
+    adopted=np.flatnonzero(state==GROUP_A)
+    for t in range(tMax):
+        start=time.perf_counter() if probe is not None else 0
+        #add the nodes that just adopted A to the neighbour counts and to the frontier
+        neighbours=neighbourIndices(indptr,indices,adopted)
+        np.add.at(k,neighbours,1)
+        frontier=np.union1d(frontier,neighbours)
+        frontier=frontier[state[frontier]==UNDECIDED]
+        if frontier.size==0 or p<=0:
+            if probe is not None:
+                probe.step('frontier',t,time.perf_counter()-start,neighbours.size,0,0)
+            data[t+1:]=data[t]
+            break
+        adopted=frontier[rng.random(frontier.size)<probabilities[k[frontier]]]
+        state[adopted]=GROUP_A
+        if history:
+            times[adopted]=t+1
+        if probe is not None:
+            probe.step('frontier',t,time.perf_counter()-start,neighbours.size,frontier.size,adopted.size)
+        data[t+1]=data[t]
+        data[t+1,UNDECIDED]-=adopted.size
+        data[t+1,GROUP_A]+=adopted.size
+    if history:
+        return data.tolist(),AdoptionHistory(nodes,times,tMax)
+    return data.tolist()
+
+#result of runModel: data holds the number of nodes in state u, a, and b at each step and history the AdoptionHistory of the run (None if not requested)
+class RunResult:
+    def __init__(self,data,history=None):
+        self.data=data
+        self.history=history
+
+#runs the dynamics on G with the chosen engine ('graph', 'array' or 'frontier') without modifying G, so the same graph can be shared
+#by concurrent runs. writeAttributes=True restores the legacy behaviour of storing the adoption times on the nodes of G
+#seed makes the run reproducible, for the 'graph' engine it seeds a private random.Random instead of the random module
+def runModel(G,tMax,groupA,groupB,p,engine='frontier',seed=None,history=False,writeAttributes=False,probe=None):
+    if engine=='graph':
+        rng=random if seed is None else random.Random(seed)
+        result=graphModelRun(G,tMax,groupA,groupB,p,writeAttributes=False,history=True,rng=rng,probe=probe)
+    elif engine=='array':
+        result=arrayModelRun(G,tMax,groupA,groupB,p,seed=seed,history=True,probe=probe)
+    elif engine=='frontier':
+        result=frontierModelRun(G,tMax,groupA,groupB,p,seed=seed,history=True,probe=probe)
+    else:
+        raise ValueError("Unknown engine: "+str(engine))
+    data,runHistory=result
+    if writeAttributes:
+        import networkx as nx
+        nx.set_node_attributes(G,dict(zip(runHistory.nodes,runHistory.times.tolist())),'adopted')
+    return RunResult(data,runHistory if history else None)
@@ -0,0 +1,116 @@
+import aggregation as agg
+import experiments as exp
+import graphstore as gs
+import sweep
+import numpy as np
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor,wait,FIRST_COMPLETED
+
+#experiments over an ensemble of graph realizations instead of a single graph, so that the conclusions include the noise of the graph
+#realization besides the noise of the dynamics. Producer processes generate the realizations and simulation processes run every
+#strategy on them; at most buffer graphs are alive at any time (being generated, waiting, or being simulated), so memory stays at a few
+#graphs while the producers work ahead of the simulations
+
+#builds realization n of the ensemble with graphstore.GENERATORS[generator](**parameters,seed=seed)
+def generateRealization(task):
+    n,generator,parameters,seed=task
+    return n,gs.GENERATORS[generator](**parameters,seed=seed)
+
+#runs replicas of every strategy (names of sweep.STRATEGIES) on realization n, all of them with the same seed so that the strategies are
+#compared on the same randomness, and strategySeed fixes the pivots of the sampled strategies.
+#Returns n and a dictionary strategy->array of shape (replicas,tMax+1,3)
+def simulateRealization(task):
+    n,G,strategies,tMax,probability,sizeGroupA,sizeGroupB,replicas,seed,strategySeed=task
+    data={}
+    for name in strategies:
+        strategy=sweep.STRATEGIES[name]
+        if strategy is None:
+            seeds,forth,fifth=exp.fullyRandomSeeds,sizeGroupA,sizeGroupB
+        else:
+            seeds,forth,fifth=exp.halfRandomSeedsB,strategy(G,sizeGroupB,strategySeed),sizeGroupA
+        data[name]=exp.batchedExperiments(seeds,G,tMax,probability,forth,fifth,replicas,seed).astype(np.int32)
+    return n,data
+
+#aggregation of the replicas of one strategy over the realizations, added one realization at a time:
+#realizations accumulates the mean trajectory of every realization, so its half-width is the confidence interval of the ensemble mean
+#with the realizations as independent samples, and pooled accumulates all the replicas of all the realizations.
+#for every metric of aggregation.METRICS the variance is split between the realizations (variance of the mean of the metric over the
+#graphs) and within them (variance over the replicas of a graph), as in a one-way random-effects analysis of variance
+class EnsembleAccumulator:
+    def __init__(self,tMax,seed=None):
+        self.realizations=agg.ReplicaAccumulator(tMax,seed=seed)
+        self.pooled=agg.ReplicaAccumulator(tMax,seed=seed)
+        self.means={metric:[] for metric in agg.METRICS}
+        self.variances={metric:[] for metric in agg.METRICS}
+        self.replicas=[]
+
+    #adds the replicas of one realization, an array of shape (replicas,tMax+1,3)
+    def add(self,data):
+        self.realizations.add(data.mean(axis=0))
+        self.pooled.addBatch(data)
+        self.replicas.append(len(data))
+        for metric,function in agg.METRICS.items():
+            values=function(data)
+            self.means[metric].append(float(values.mean()))
+            self.variances[metric].append(float(values.var(ddof=1)) if len(values)>1 else 0.0)
+
+    #mean, confidence half-width and variance components of every metric over the realizations added so far
+    def report(self,level=0.95):
+        report={}
+        for metric in agg.METRICS:
+            means=np.array(self.means[metric])
+            within=float(np.mean(self.variances[metric])) if len(means) else 0.0
+            observed=float(means.var(ddof=1)) if len(means)>1 else 0.0
+            report[metric]={'mean':float(means.mean()) if len(means) else float('nan'),
+                            'halfWidth':float(agg.meanHalfWidth(means,level)),
+                            'betweenVariance':float(max(observed-within/np.mean(self.replicas),0.0)) if len(means)>1 else 0.0,
+                            'withinVariance':within}
+        return report
+
+#runs the given strategies (names of sweep.STRATEGIES, 'random' for fully random groups) on realizations graphs drawn from the generator
+#and parameters of graph (a dictionary as the graphs of scenarios.json), replicas replicas per strategy and realization.
+#producers processes generate the graphs and simulators processes (all the other cores by default) run the strategies on them, with at
+#most buffer graphs alive (producers+simulators by default). Every realization gets its own graph, run and strategy seeds spawned from seed,
+#and the results are folded in the order of the realizations, so they do not depend on the number of processes.
+#returns the list of the realizations, each one a dictionary strategy->aggregation.ReplicaAccumulator of its replicas, and a dictionary
+#strategy->EnsembleAccumulator over the whole ensemble
+def ensembleExperiments(graph,strategies,realizations,tMax=50,probability=0.5,sizeGroupA=5,sizeGroupB=5,replicas=50,seed=0,
+                        producers=1,simulators=None,buffer=None):
+    if graph['generator'] not in gs.GENERATORS:
+        raise ValueError("Unknown generator: "+str(graph['generator']))
+    for name in strategies:
+        if name not in sweep.STRATEGIES:
+            raise ValueError("Unknown strategy: "+str(name))
+    simulators=simulators or max(1,(os.cpu_count() or 1)-producers)
+    buffer=max(buffer or producers+simulators,1)
+    seeds=[realizationSeed.spawn(3) for realizationSeed in np.random.SeedSequence(seed).spawn(realizations)]
+    perRealization=[]
+    ensemble={name:EnsembleAccumulator(tMax,seed) for name in strategies}
+    generating,simulating,ready,finished=set(),set(),deque(),{}
+    submitted=0
+    with ProcessPoolExecutor(producers) as generatorPool,ProcessPoolExecutor(simulators) as simulationPool:
+        while len(perRealization)<realizations:
+            while submitted<realizations and len(generating)<producers and len(generating)+len(ready)+len(simulating)<buffer:
+                generating.add(generatorPool.submit(generateRealization,(submitted,graph['generator'],graph['parameters'],seeds[submitted][0])))
+                submitted+=1
+            while ready and len(simulating)<simulators:
+                n,G=ready.popleft()
+                simulating.add(simulationPool.submit(simulateRealization,(n,G,strategies,tMax,probability,sizeGroupA,sizeGroupB,replicas,seeds[n][1],seeds[n][2])))
+            done,pending=wait(generating|simulating,return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in generating:
+                    generating.remove(future)
+                    ready.append(future.result())
+                else:
+                    simulating.remove(future)
+                    n,data=future.result()
+                    finished[n]=data
+                    print("Realization:",n,"done.")
+            #fold the realizations in order, keeping the ones that finished early
+            while len(perRealization) in finished:
+                data=finished.pop(len(perRealization))
+                perRealization.append({name:agg.summarise(data[name]) for name in strategies})
+                for name in strategies:
+                    ensemble[name].add(data[name])
+    return perRealization,ensemble
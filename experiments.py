@@ -1,60 +1,161 @@
 import engine as en
-import powerlaw
-import random 
-import networkx as nx 
-
-#generate a random list of sampleSize nodes from G ignoring the nodes in the list exclude
-def generateRandomSample(G,sampleSize,exclude):
-    sample=[]
-    nodelist=[n for n in G if n not in exclude]
-    if len(nodelist)<sampleSize:
-        return None
-    while len(sample)<sampleSize: 
-        newExtraction=nodelist[random.randint(0,len(nodelist)-1)] 
-        if newExtraction not in sample:
-            sample.append(newExtraction)   
-    return sample
-
-#generate a discrete random sample of the given size with powerlaw distribution of parameter gamma
-def generatePowerLawSample(size,gamma):
-    td=powerlaw.Power_Law(xmin=1,parameters=[gamma],discrete=True)
-    sample=[1]
-    while sum(sample)%2:
-        sample=[int(n) for n in td.generate_random(size)]
-    return sample
+import sampling as smp
+import generators as gen
+import aggregation as agg
+import instrumentation as ins
+import numpy as np
+import inspect
+import time
+
+#generate a random list of sampleSize nodes from G ignoring the nodes in the list exclude, or None if there are not enough nodes
+#rng is anything accepted by np.random.default_rng and method is 'uniform', 'degree' or 'stratified' (see sampling.NodeSampler)
+def generateRandomSample(G,sampleSize,exclude,rng=None,method='uniform'):
+    return smp.nodeSampler(G).sample(sampleSize,exclude,rng,method)
+
+#generate a discrete random sample of the given size with powerlaw distribution of parameter gamma (see generators.powerLawDegrees)
+def generatePowerLawSample(size,gamma,rng=None):
+    return gen.powerLawDegrees(size,gamma,rng).tolist()
 
 #generates a graph of the desired size with powerlaw distribution og parameter gamma 
-def generatePowerLawGraph(size,gamma):
-    degreeDistribution=generatePowerLawSample(size,gamma)
-    return nx.configuration_model(degreeDistribution)
+#seed (an integer) fixes both the degrees and the matching of the configuration model
+def generatePowerLawGraph(size,gamma,seed=None):
+    degreeDistribution=generatePowerLawSample(size,gamma,seed)
+    import networkx as nx
+    return nx.configuration_model(degreeDistribution,seed=seed)
     
+#returns randomly selected groupA and groupB of the given sizes
+def fullyRandomSeeds(G,sizeGroupA,sizeGroupB,rng=None,method='uniform'):
+    rng=np.random.default_rng(rng)
+    groupA=generateRandomSample(G,sizeGroupA,[],rng,method)
+    groupB=generateRandomSample(G,sizeGroupB,groupA,rng,method)
+    return groupA,groupB
+
+#returns the specified groupA and sizeGroupB randomly selected nodes for groupB
+def halfRandomSeedsA(G,groupA,sizeGroupB,rng=None,method='uniform'):
+    return groupA,generateRandomSample(G,sizeGroupB,groupA,rng,method)
+
+#returns sizeGroupA randomly selected nodes for groupA and the specified groupB
+def halfRandomSeedsB(G,groupB,sizeGroupA,rng=None,method='uniform'):
+    return generateRandomSample(G,sizeGroupA,groupB,rng,method),groupB
+
 #runs the model on G with the specified probability  starting with randomly selected nodes for groupA and groupB 
-def fullyRandomExperiment(G,tMax,probability,sizeGroupA,sizeGroupB):
-    groupA=generateRandomSample(G,sizeGroupA,[])
-    groupB=generateRandomSample(G,sizeGroupB,groupA)   
-    return en.graphModelRun(G, tMax, groupA, groupB,probability)
+#rng (anything accepted by np.random.default_rng) draws both the groups and the dynamics, so a seed makes the run reproducible
+def fullyRandomExperiment(G,tMax,probability,sizeGroupA,sizeGroupB,rng=None):
+    rng=np.random.default_rng(rng)
+    groupA,groupB=fullyRandomSeeds(G,sizeGroupA,sizeGroupB,rng)
+    return en.runModel(G, tMax, groupA, groupB,probability,seed=rng).data
     
 #runs the model on G with the specified probability starting with sizeGroupB randomly selected nodes for groupB and with the specified nodes in groupA
-def halfRandomExperimentA(G,tMax,probability,groupA,sizeGroupB):
-    groupB=generateRandomSample(G,sizeGroupB,groupA)   
-    return en.graphModelRun(G, tMax, groupA, groupB,probability)
+def halfRandomExperimentA(G,tMax,probability,groupA,sizeGroupB,rng=None):
+    rng=np.random.default_rng(rng)
+    groupA,groupB=halfRandomSeedsA(G,groupA,sizeGroupB,rng)
+    return en.runModel(G, tMax, groupA, groupB,probability,seed=rng).data
 
 #runs the model on G with the specified probability starting with sizeGroupA randomly selected nodes for groupA and with the specified nodes in groupB
-def halfRandomExperimentB(G,tMax,probability,groupB,sizeGroupA):
-    groupA=generateRandomSample(G,sizeGroupA,groupB)   
-    return en.graphModelRun(G,tMax, groupA, groupB,probability)
+def halfRandomExperimentB(G,tMax,probability,groupB,sizeGroupA,rng=None):
+    rng=np.random.default_rng(rng)
+    groupA,groupB=halfRandomSeedsB(G,groupB,sizeGroupA,rng)
+    return en.runModel(G,tMax, groupA, groupB,probability,seed=rng).data
+
+#keyword arguments passing the generator rng to experiment: experiments with an rng parameter (as the ones of this module) get it,
+#the five-argument experiments written before it existed are called as before and draw from their own random state
+def rngKeyword(experiment,rng):
+    try:
+        parameters=inspect.signature(experiment).parameters.values()
+    except (TypeError,ValueError):
+        return {}
+    if any(parameter.name=='rng' or parameter.kind==parameter.VAR_KEYWORD for parameter in parameters):
+        return {'rng':rng}
+    return {}
 
 #runs the function experiment with parameters G, tMax, probability, forthArgument, and fifthArgument for experimentsNumber times and returns a dictionary of the results
-def repeatedExperiments(experiment,G,tMax,probability,forthArgument,fifthArgument,experimentsNumber):
+#all the replicas draw from one generator seeded with seed (passed as the keyword rng to the experiments that accept it, see rngKeyword),
+#so the same seed gives the same results
+#inside instrumentation.profile() every replica is marked on the probe, so its wall time is split between the engine and the rest
+def repeatedExperiments(experiment,G,tMax,probability,forthArgument,fifthArgument,experimentsNumber,seed=None):
     data={}
+    keywords=rngKeyword(experiment,np.random.default_rng(seed))
+    probe=ins.activeProbe()
     #run the experiments
     for n in range(experimentsNumber):
-        data[n]=experiment(G,tMax,probability,forthArgument,fifthArgument)
+        if probe is not None:
+            probe.startReplica(n)
+        data[n]=experiment(G,tMax,probability,forthArgument,fifthArgument,**keywords)
         print("Experiment:", n, "done.")
+        if probe is not None:
+            probe.endReplica()
     return data
 
-#takes a dictionary experimentDataDict as the one produced by repeatedExperiments and computes a list which contains the average number of nodes in state u, a, and b at each time step 
+#same as repeatedExperiments, but every replica is added to accumulator (an aggregation.ReplicaAccumulator, a new one by default)
+#as soon as it is done instead of being kept, returns the accumulator
+def streamedExperiments(experiment,G,tMax,probability,forthArgument,fifthArgument,experimentsNumber,accumulator=None,seed=None):
+    if accumulator is None:
+        accumulator=agg.ReplicaAccumulator(tMax)
+    keywords=rngKeyword(experiment,np.random.default_rng(seed))
+    probe=ins.activeProbe()
+    for n in range(experimentsNumber):
+        if probe is not None:
+            probe.startReplica(n)
+        accumulator.add(experiment(G,tMax,probability,forthArgument,fifthArgument,**keywords))
+        print("Experiment:", n, "done.")
+        if probe is not None:
+            probe.endReplica()
+    return accumulator
+
+#draws the initial groups of experimentsNumber replicas with seeds(G,forthArgument,fifthArgument) and runs all of them at once with en.batchModelRun
+#returns an array of shape (experimentsNumber,tMax+1,3) that averageExperiment can reduce directly
+#seed makes both the initial groups and the dynamics reproducible
+def batchedExperiments(seeds,G,tMax,probability,forthArgument,fifthArgument,experimentsNumber,seed=None):
+    rng=np.random.default_rng(seed)
+    groups=[seeds(G,forthArgument,fifthArgument,rng) for n in range(experimentsNumber)]
+    groupsA=[groupA for groupA,groupB in groups]
+    groupsB=[groupB for groupA,groupB in groups]
+    return en.batchModelRun(G,tMax,groupsA,groupsB,probability,rng)
+
+#runs replicas batchSize at a time with runner (repeatedExperiments, or batchedExperiments with a seeds function) until the confidence
+#interval of the mean of every metric (names of aggregation.METRICS) has half-width at most targetHalfWidth (a number or a dictionary
+#metric->number), or until maxReplicas replicas or maxSeconds seconds have been used. The Student t half-width alone stops too early
+#on bimodal outcomes (e.g. the rare runs where the adoption dies out), whose sd looks small until the rare mode is first drawn, so the
+#half-width of a metric with a range in aggregation.RANGES also includes aggregation.unseenHalfWidth, the shift of the mean that the
+#outcomes not observed yet could still cause. If seed is given every batch is run with its own seed spawned from it (passed to runner
+#as the keyword seed), so the same seed gives the same replicas. Returns the aggregation.ReplicaAccumulator of all
+#the replicas and a report with the number of replicas used, the mean and half-width of every metric and whether the target was met
+def adaptiveExperiments(experiment,G,tMax,probability,forthArgument,fifthArgument,targetHalfWidth,metrics=('final','peakTime'),
+                        runner=repeatedExperiments,batchSize=10,minReplicas=30,maxReplicas=1000,maxSeconds=None,level=0.95,seed=None):
+    if not isinstance(targetHalfWidth,dict):
+        targetHalfWidth={metric:targetHalfWidth for metric in metrics}
+    seedSequence=np.random.SeedSequence(seed)
+    accumulator=agg.ReplicaAccumulator(tMax,seed=seedSequence.spawn(1)[0])
+    values={metric:[] for metric in metrics}
+    ranges={}
+    start=time.perf_counter()
+    while True:
+        size=min(batchSize,maxReplicas-accumulator.count)
+        keywords={} if seed is None else {'seed':seedSequence.spawn(1)[0]}
+        data=runner(experiment,G,tMax,probability,forthArgument,fifthArgument,size,**keywords)
+        if isinstance(data,dict):
+            data=np.array([data[n] for n in range(len(data))])
+        accumulator.addBatch(data)
+        for metric in metrics:
+            values[metric].extend(agg.METRICS[metric](data).tolist())
+            if metric in agg.RANGES and metric not in ranges:
+                ranges[metric]=agg.RANGES[metric](data)
+        halfWidths={metric:agg.meanHalfWidth(values[metric],level)+(agg.unseenHalfWidth(values[metric],*ranges[metric],level) if metric in ranges else 0)
+                    for metric in metrics}
+        converged=accumulator.count>=minReplicas and all(halfWidths[metric]<=targetHalfWidth[metric] for metric in metrics)
+        if converged or accumulator.count>=maxReplicas or (maxSeconds is not None and time.perf_counter()-start>=maxSeconds):
+            break
+    report={'replicas':accumulator.count,
+            'converged':converged,
+            'means':{metric:float(np.mean(values[metric])) for metric in metrics},
+            'halfWidths':{metric:float(halfWidths[metric]) for metric in metrics},
+            'seconds':time.perf_counter()-start}
+    return accumulator,report
+
+#takes a dictionary experimentDataDict as the one produced by repeatedExperiments (or the array produced by batchedExperiments) and computes a list which contains the average number of nodes in state u, a, and b at each time step 
 def averageExperiment(experimentDataDict,tMax):
+    if isinstance(experimentDataDict,np.ndarray):
+        return experimentDataDict[:,:tMax].mean(axis=0).tolist()
     numberofStates=3
     experimentsNumber=len(experimentDataDict)
     return [[sum([experimentDataDict[n][t][i] for n in range(experimentsNumber)])/experimentsNumber for i in range(numberofStates)] for t in range(tMax)]
@@ -0,0 +1,74 @@
+import engine as en
+import numpy as np
+from scipy.sparse import coo_array
+
+#largest degree whose probability is tabulated exactly by powerLawDegrees
+TABULATED_DEGREES=10000
+
+#discrete power-law degree sequence of the given size with exponent gamma and minimum degree 1 (P(k)=k^-gamma/zeta(gamma)), drawn in one
+#vectorised inverse transform: degrees up to TABULATED_DEGREES come from the exact cumulative distribution and the rare larger ones from
+#its continuous tail approximation. If the sum is odd a single stub is added to a random node instead of redrawing the whole sequence
+def powerLawDegrees(size,gamma,rng=None):
+    rng=np.random.default_rng(rng)
+    from scipy.special import zeta
+    normalisation=zeta(gamma)
+    cumulative=np.cumsum(np.arange(1,TABULATED_DEGREES+1,dtype=np.float64)**-gamma)/normalisation
+    r=rng.random(size)
+    degrees=np.searchsorted(cumulative,r,side='right').astype(np.float64)+1
+    tail=r>=cumulative[-1]
+    degrees[tail]=np.floor(0.5+((1-r[tail])*(gamma-1)*normalisation)**(-1/(gamma-1)))
+    degrees=np.minimum(degrees,np.iinfo(np.int32).max).astype(np.int64)
+    if degrees.sum()%2:
+        degrees[rng.integers(size)]+=1
+    return degrees
+
+#simple undirected graph on the nodes 0..size-1 with the edges (u[i],v[i]), built directly as a CSRGraph
+#self-loops are dropped and parallel edges are merged
+def edgesToCSR(size,u,v):
+    keep=u!=v
+    u,v=u[keep],v[keep]
+    indexType=np.int32 if size<np.iinfo(np.int32).max else np.int64
+    rows=np.concatenate([u,v]).astype(indexType)
+    cols=np.concatenate([v,u]).astype(indexType)
+    adjacency=coo_array((np.ones(len(rows),dtype=np.int32),(rows,cols)),shape=(size,size)).tocsr()
+    adjacency.sum_duplicates()
+    adjacency.data[:]=1
+    return en.CSRGraph(adjacency.indptr,adjacency.indices,data=adjacency.data)
+
+#configuration model with the given degree sequence: the stubs are shuffled and paired in place, then merged into a simple graph
+#as nx.Graph(nx.configuration_model(degrees)) without self-loops
+def configurationGraph(degrees,rng=None):
+    rng=np.random.default_rng(rng)
+    stubs=np.repeat(np.arange(len(degrees),dtype=np.int32 if len(degrees)<np.iinfo(np.int32).max else np.int64),degrees)
+    rng.shuffle(stubs)
+    return edgesToCSR(len(degrees),stubs[0::2],stubs[1::2])
+
+#scale-free graph of the given size with power-law degree distribution of parameter gamma, O(N+M)
+def powerLawGraph(size,gamma,seed=None):
+    rng=np.random.default_rng(seed)
+    return configurationGraph(powerLawDegrees(size,gamma,rng),rng)
+
+#Erdos-Renyi G(n,p) graph in O(N+M): the positions of the edges among the N(N-1)/2 pairs are found by skipping geometric gaps
+#(Batagelj-Brandes) and decoded into the pair (i,j) with i<j
+def gnpGraph(size,p,seed=None):
+    rng=np.random.default_rng(seed)
+    pairs=size*(size-1)//2
+    if p<=0 or pairs==0:
+        positions=np.empty(0,dtype=np.int64)
+    elif p>=1:
+        positions=np.arange(pairs,dtype=np.int64)
+    else:
+        chunks=[]
+        last=-1
+        expected=int(pairs*p+5*np.sqrt(pairs*p)+10)
+        while last<pairs:
+            chunk=last+np.cumsum(rng.geometric(p,size=expected))
+            chunks.append(chunk[chunk<pairs])
+            last=chunk[-1]
+        positions=np.concatenate(chunks)
+    j=np.floor((1+np.sqrt(1+8*positions.astype(np.float64)))/2).astype(np.int64)
+    #correct the rounding of the square root for very large positions
+    j-=j*(j-1)//2>positions
+    j+=(j+1)*j//2<=positions
+    i=positions-j*(j-1)//2
+    return edgesToCSR(size,i,j)
@@ -0,0 +1,97 @@
+import engine as en
+import generators as gen
+import numpy as np
+import json
+import os
+
+#layout of a graph file: the 8 byte MAGIC, the length of the JSON header as a little-endian uint64, the header, then the arrays
+#indptr, indices and data (and nodes if the labels are not 0..N-1) each starting at a multiple of ALIGNMENT
+#the header holds the metadata (generator, parameters, seed) and the dtype, shape and offset of every array
+MAGIC=b'CSRGRAPH'
+ALIGNMENT=64
+VERSION=1
+
+#generators whose graphs can be cached by cachedGraph, the parameters are passed by name together with seed
+GENERATORS={
+    'gnp':gen.gnpGraph,
+    'powerlaw':gen.powerLawGraph,
+}
+
+def align(offset):
+    return -(-offset//ALIGNMENT)*ALIGNMENT
+
+#writes G (a networkx graph or a CSRGraph) to filename, metadata is any JSON serialisable dictionary such as
+#{'generator':'gnp','parameters':{'size':1000,'p':0.0015},'seed':0}. Node labels that are not the rows 0..N-1 must be integers
+#the file is written to a temporary name and renamed into place, so readers never see a partial graph
+def saveGraph(G,filename,metadata=None):
+    if not isinstance(G,en.CSRGraph):
+        G=en.CSRGraph.fromGraph(G)
+    arrays={'indptr':G.indptr,'indices':G.indices,'data':G.adjacency.data}
+    if not isinstance(G.nodes,range):
+        nodes=np.asarray(G.nodes)
+        if nodes.dtype.kind not in 'iu':
+            raise ValueError("Unsupported node labels: "+str(nodes.dtype))
+        if not np.array_equal(nodes,np.arange(len(nodes))):
+            arrays['nodes']=nodes.astype(np.int64)
+    header={'version':VERSION,'metadata':metadata if metadata is not None else G.metadata,'arrays':{}}
+    #offsets are relative to the end of the header, whose length does not depend on them
+    offset=0
+    for name,array in arrays.items():
+        header['arrays'][name]={'dtype':array.dtype.str,'shape':list(array.shape),'offset':offset}
+        offset=align(offset+array.nbytes)
+    encoded=json.dumps(header).encode()
+    start=align(len(MAGIC)+8+len(encoded))
+    temporary=filename+".tmp"
+    with open(temporary,'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(encoded)).tobytes())
+        f.write(encoded)
+        for name,array in arrays.items():
+            f.seek(start+header['arrays'][name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(start+offset)
+    os.replace(temporary,filename)
+
+#returns the metadata dictionary stored in the file and the offset at which its arrays start
+def readHeader(filename):
+    with open(filename,'rb') as f:
+        if f.read(len(MAGIC))!=MAGIC:
+            raise ValueError("Not a graph file: "+str(filename))
+        length=int(np.frombuffer(f.read(8),dtype=np.uint64)[0])
+        header=json.loads(f.read(length))
+    if header['version']!=VERSION:
+        raise ValueError("Unsupported graph file version: "+str(header['version']))
+    return header,align(len(MAGIC)+8+length)
+
+#maps the graph stored in filename as a read-only CSRGraph without copying it: the pages are read on demand and shared
+#by all the processes that load the same file, so every worker can open it instead of receiving a copy
+def loadGraph(filename):
+    header,start=readHeader(filename)
+    arrays={}
+    for name,spec in header['arrays'].items():
+        arrays[name]=np.memmap(filename,dtype=spec['dtype'],mode='r',offset=start+spec['offset'],shape=tuple(spec['shape']))
+    nodes=arrays['nodes'].tolist() if 'nodes' in arrays else None
+    return en.CSRGraph(arrays['indptr'],arrays['indices'],nodes,arrays['data'],header['metadata'],filename)
+
+#returns the metadata stored in filename without mapping the graph
+def graphMetadata(filename):
+    return readHeader(filename)[0]['metadata']
+
+#networkx graph of the graph stored in filename, for the centrality and visualizer code that needs one
+def loadNetworkx(filename):
+    return loadGraph(filename).toNetworkx()
+
+#loads the graph of filename if it was built by the same generator with the same parameters and seed,
+#otherwise builds it with GENERATORS[generator](**parameters,seed=seed) and saves it there for the next time
+def cachedGraph(filename,generator,parameters,seed):
+    if generator not in GENERATORS:
+        raise ValueError("Unknown generator: "+str(generator))
+    metadata={'generator':generator,'parameters':parameters,'seed':seed}
+    if os.path.exists(filename) and graphMetadata(filename)==json.loads(json.dumps(metadata)):
+        return loadGraph(filename)
+    G=GENERATORS[generator](**parameters,seed=seed)
+    directory=os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory,exist_ok=True)
+    saveGraph(G,filename,metadata)
+    return loadGraph(filename)
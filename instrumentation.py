@@ -0,0 +1,93 @@
+import contextlib
+import csv
+import json
+import time
+
+#fields of the record of one step of an engine and of one replica of an experiment runner
+STEP_FIELDS=('engine','replica','step','seconds','scanned','draws','transitions')
+REPLICA_FIELDS=('replica','seconds','engineSeconds','harnessSeconds','steps')
+
+#probe the engines report to when they are not given one explicitly, set by profile()
+_active=None
+
+#collects the per-step counters of the engines: wall time, neighbour entries scanned, random numbers drawn and nodes that changed state
+#every record is kept in steps (unless keepRecords is False) and passed to each callback as soon as it is made
+#the experiment runners also mark the replicas, so the time spent outside of the engines (sampling the groups, the harness) is visible
+class Probe:
+    def __init__(self,callbacks=(),keepRecords=True):
+        self.callbacks=list(callbacks)
+        self.keepRecords=keepRecords
+        self.steps=[]
+        self.replicas=[]
+        self.replica=None
+        self._replicaStart=None
+        self._engineSeconds=0.0
+        self._replicaSteps=0
+
+    #records one step of the engine, called by the engines only when a probe is active
+    def step(self,engine,t,seconds,scanned,draws,transitions):
+        record={'engine':engine,'replica':self.replica,'step':t,'seconds':seconds,
+                'scanned':int(scanned),'draws':int(draws),'transitions':int(transitions)}
+        self._engineSeconds+=seconds
+        self._replicaSteps+=1
+        if self.keepRecords:
+            self.steps.append(record)
+        for callback in self.callbacks:
+            callback(record)
+
+    #marks the start of replica n, the following steps are tagged with it
+    def startReplica(self,n):
+        self.replica=n
+        self._replicaStart=time.perf_counter()
+        self._engineSeconds=0.0
+        self._replicaSteps=0
+
+    #marks the end of the current replica and records its wall time split between the engine and the rest
+    def endReplica(self):
+        seconds=time.perf_counter()-self._replicaStart
+        self.replicas.append({'replica':self.replica,'seconds':seconds,'engineSeconds':self._engineSeconds,
+                              'harnessSeconds':seconds-self._engineSeconds,'steps':self._replicaSteps})
+        self.replica=None
+
+    #returns the sum of the counters of the steps of each engine
+    def totals(self):
+        totals={}
+        for record in self.steps:
+            total=totals.setdefault(record['engine'],{'steps':0,'seconds':0.0,'scanned':0,'draws':0,'transitions':0})
+            total['steps']+=1
+            for field in ('seconds','scanned','draws','transitions'):
+                total[field]+=record[field]
+        return totals
+
+    #writes the step and replica records to filename as JSON
+    def toJSON(self,filename):
+        with open(filename,'w') as f:
+            json.dump({'steps':self.steps,'replicas':self.replicas,'totals':self.totals()},f,indent=1)
+
+    #writes the step records to filename as CSV, one row per step
+    def toCSV(self,filename):
+        with open(filename,'w',newline='') as f:
+            writer=csv.DictWriter(f,fieldnames=STEP_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.steps)
+
+#returns the probe set by profile(), None when instrumentation is disabled
+def activeProbe():
+    return _active
+
+#context in which every engine run reports to a probe (a new Probe with the given callbacks by default), e.g.
+#    with profile() as probe:
+#        exp.repeatedExperiments(...)
+#    probe.toCSV("steps.csv")
+#the probe is not seen by the worker processes of parallel.parallelExperiments
+@contextlib.contextmanager
+def profile(callbacks=(),probe=None):
+    global _active
+    if probe is None:
+        probe=Probe(callbacks)
+    previous=_active
+    _active=probe
+    try:
+        yield probe
+    finally:
+        _active=previous
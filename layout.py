@@ -0,0 +1,136 @@
+import caching
+import engine as en
+import centrality as cen
+import networkx as nx
+import numpy as np
+from scipy.sparse.csgraph import connected_components
+
+#components with fewer nodes are drawn on a circle instead of being laid out with pivot MDS
+SMALL_COMPONENT=8
+#number of pivots of the pivot MDS of each component
+PIVOTS=50
+
+#number of edges from source to every node (-1 if unreachable), one BFS level at a time over the CSR arrays
+def bfsDistances(indptr,indices,source):
+    distances=np.full(len(indptr)-1,-1,dtype=np.int64)
+    distances[source]=0
+    frontier=np.array([source])
+    d=0
+    while frontier.size:
+        d+=1
+        neighbours=en.neighbourIndices(indptr,indices,frontier)
+        frontier=np.unique(neighbours[distances[neighbours]==-1])
+        distances[frontier]=d
+    return distances
+
+#classical MDS of one connected component approximated from the distances to a few pivots (Brandes and Pich, pivot MDS):
+#O(pivots*edges) time and O(pivots*nodes) memory. The pivots are chosen max-min, each one as far as possible from the previous ones
+def pivotMDS(adjacency,pivots=PIVOTS,rng=None):
+    rng=np.random.default_rng(rng)
+    size=adjacency.shape[0]
+    pivots=min(pivots,size)
+    distances=np.empty((pivots,size))
+    closest=np.full(size,np.inf)
+    pivot=int(rng.integers(size))
+    for i in range(pivots):
+        distances[i]=bfsDistances(adjacency.indptr,adjacency.indices,pivot)
+        closest=np.minimum(closest,distances[i])
+        pivot=int(np.argmax(closest))
+    #double centering of the squared distances, then the two leading directions of the pivot space
+    squared=distances**2
+    centered=-0.5*(squared-squared.mean(axis=1,keepdims=True)-squared.mean(axis=0,keepdims=True)+squared.mean())
+    values,vectors=np.linalg.eigh(centered@centered.T)
+    coordinates=centered.T@vectors[:,[-1,-2]] if pivots>1 else np.zeros((size,2))
+    return coordinates
+
+#positions of the nodes of G (in the order of en.graphToCSR) with every connected component laid out on its own and the components
+#packed in rows from the top, the largest first, each one in a square of side proportional to the square root of its size
+def componentLayout(G,seed=0):
+    adjacency,nodes,index=en.graphToCSR(G)
+    rng=np.random.default_rng(seed)
+    count,labels=connected_components(adjacency,directed=False)
+    sizes=np.bincount(labels,minlength=count)
+    order=np.argsort(labels,kind='stable')
+    starts=np.concatenate(([0],np.cumsum(sizes)[:-1]))
+    coordinates=np.zeros((len(nodes),2))
+    #small components: the nodes on a circle, all of them at once
+    rank=np.arange(len(nodes))-starts[labels[order]]
+    small=sizes[labels[order]]<SMALL_COMPONENT
+    angle=2*np.pi*rank[small]/sizes[labels[order]][small]
+    coordinates[order[small]]=np.column_stack([np.cos(angle),np.sin(angle)])
+    #large components: pivot MDS, rescaled to the unit disc
+    for c in np.flatnonzero(sizes>=SMALL_COMPONENT):
+        members=order[starts[c]:starts[c]+sizes[c]]
+        component=pivotMDS(adjacency[members][:,members],rng=rng)
+        component-=component.mean(axis=0)
+        radius=np.sqrt((component**2).sum(axis=1)).max()
+        coordinates[members]=component/radius if radius>0 else component
+    #shelf packing of the components, the disc of component c has radius sqrt(size)
+    radii=np.sqrt(sizes)
+    width=2*np.sqrt((4*sizes).sum())
+    offsets=np.empty((count,2))
+    x=y=rowHeight=0.0
+    for c in np.argsort(-sizes,kind='stable'):
+        side=2*radii[c]
+        if x>0 and x+side>width:
+            x,y,rowHeight=0.0,y+rowHeight,0.0
+        offsets[c]=(x+radii[c],-y-radii[c])
+        x+=side
+        rowHeight=max(rowHeight,side)
+    coordinates=coordinates*radii[labels,None]*0.9+offsets[labels]
+    coordinates-=coordinates.min(axis=0,initial=0)
+    return coordinates/max(width,y+rowHeight)
+
+#networkx spring layout, only practical for graphs of a few thousand nodes
+def springLayout(G,seed=0):
+    if isinstance(G,en.CSRGraph):
+        G=G.toNetworkx()
+    positions=nx.spring_layout(G,seed=seed)
+    adjacency,nodes,index=en.graphToCSR(G)
+    return np.array([positions[n] for n in nodes]).reshape(-1,2)
+
+#layout algorithms, each one maps a graph and a seed to the array of the positions of its nodes in the order of en.graphToCSR
+LAYOUTS={
+    'components':componentLayout,
+    'spring':springLayout,
+}
+
+#keeps the layouts of each (graph fingerprint, algorithm, seed) in memory, evicting the least recently used ones beyond maxEntries
+#if directory is given every layout is also stored there on disk and reloaded by later sessions
+class LayoutCache(caching.KeyedCache):
+    def __init__(self,maxEntries=8,directory=None):
+        super().__init__(maxEntries,directory,".npy",np.load,np.save)
+
+    #returns the Nx2 array of the positions of the nodes of G in the order of en.graphToCSR, computing it only if it was never cached
+    def coordinates(self,G,algorithm='components',seed=0):
+        if algorithm not in LAYOUTS:
+            raise ValueError("Unknown layout: "+str(algorithm))
+        return self.get((cen.graphFingerprint(G),algorithm,seed),lambda: LAYOUTS[algorithm](G,seed))
+
+    #returns the positions of the nodes of G as the dictionary node->(x,y) expected by the visualizer
+    def positions(self,G,algorithm='components',seed=0):
+        adjacency,nodes,index=en.graphToCSR(G)
+        return dict(zip(nodes,map(tuple,self.coordinates(G,algorithm,seed).tolist())))
+
+#directory where the session cache stores the layouts, so later sessions reload them instead of laying the graphs out again
+LAYOUT_DIRECTORY="layouts"
+
+#cache shared by the whole session, backed by LAYOUT_DIRECTORY
+defaultCache=LayoutCache(directory=LAYOUT_DIRECTORY)
+
+#returns the positions of the nodes of G using the given cache (the session cache by default)
+def positions(G,algorithm='components',seed=0,cache=None):
+    return (cache or defaultCache).positions(G,algorithm,seed)
+
+#coordinates of the edges of G for a line trace: x and y list the two ends of every edge followed by a NaN that breaks the line
+#built with a single gather from the upper triangle of the CSR adjacency, positions is a dictionary node->(x,y) or the array of LayoutCache.coordinates
+def edgeCoordinates(G,positions):
+    adjacency,nodes,index=en.graphToCSR(G)
+    if isinstance(positions,dict):
+        positions=np.array([positions[n] for n in nodes],dtype=float).reshape(-1,2)
+    rows=np.repeat(np.arange(len(nodes)),np.diff(adjacency.indptr))
+    upper=rows<adjacency.indices
+    rows,cols=rows[upper],adjacency.indices[upper]
+    x=np.column_stack([positions[rows,0],positions[cols,0],np.full(rows.size,np.nan)]).ravel()
+    y=np.column_stack([positions[rows,1],positions[cols,1],np.full(rows.size,np.nan)]).ravel()
+    return x,y
@@ -0,0 +1,89 @@
+import engine as en
+import numpy as np
+
+#deterministic predictions of the expected number of nodes in state u, a, and b at each step, without Monte Carlo replicas
+#every node starts in groupA with probability initialA[i] and in groupB with probability initialB[i] (arrays in the order of en.graphToCSR),
+#and an undecided node adopts A with the probability 1-(1-p)^k of the engines, averaged over its neighbours being in groupA or not
+
+#individual-based mean field: the neighbours are assumed independent, so an undecided node stays undecided with probability
+#prod_j (1-p*P(j in A)). One sparse product per step; it overestimates the spread because a node can be reinfected by its own adopters
+def individualBased(adjacency,tMax,p,initialA,initialB):
+    undecided=1-initialA-initialB
+    adopted=initialA.copy()
+    trajectory=[adopted.sum()]
+    for t in range(tMax):
+        stay=np.exp(adjacency@np.log1p(-p*adopted))
+        adopted=adopted+undecided*(1-stay)
+        undecided=undecided*stay
+        trajectory.append(adopted.sum())
+    return np.array(trajectory)
+
+#dynamic message passing (Lokhov et al. 2015) for this dynamics, an SI model where the nodes in groupB never adopt nor transmit.
+#for every directed edge k->i, theta is the probability that k has not yet convinced i and phi the probability that k is in A
+#without having convinced i. The cavity products leave out the message coming back from i, so unlike individualBased it is exact on trees
+def messagePassing(adjacency,tMax,p,initialA,initialB):
+    size=adjacency.shape[0]
+    adjacency=adjacency.sorted_indices()
+    undecided=1-initialA-initialB
+    #entry e of the CSR arrays is the message from sender[e]=indices[e] to receiver[e]=row of e, reverse[e] is the message going back
+    receiver=np.repeat(np.arange(size,dtype=np.int64),np.diff(adjacency.indptr))
+    sender=adjacency.indices.astype(np.int64)
+    reverse=np.searchsorted(receiver*size+sender,sender*size+receiver)
+    theta=np.ones(sender.size)
+    phi=initialA[sender].astype(float)
+    #probability that the sender is not in A when the receiver is left out (groupB counts as never in A)
+    notAdopted=1-initialA[sender]
+    trajectory=[initialA.sum()]
+    for t in range(tMax):
+        theta=theta-p*phi
+        #products of the incoming thetas of every node and of every node but one, zeros are counted apart so they can be left out exactly
+        zero=theta<=0
+        logTheta=np.log(np.where(zero,1,theta))
+        logProduct=np.bincount(receiver,logTheta,size)
+        zeros=np.bincount(receiver,zero,size)
+        cavity=np.where(zeros[sender]-zero[reverse]>0,0,np.exp(logProduct[sender]-logTheta[reverse]))
+        previous=notAdopted
+        notAdopted=initialB[sender]+undecided[sender]*cavity
+        phi=(1-p)*phi+(previous-notAdopted)
+        stay=np.where(zeros>0,0,np.exp(logProduct))
+        trajectory.append((initialA+undecided*(1-stay)).sum())
+    return np.array(trajectory)
+
+METHODS={
+    'ibmf':individualBased,
+    'dmp':messagePassing,
+}
+
+#expected number of nodes in state u, a, and b at each step 0..tMax, as the list returned by aggregation.ReplicaAccumulator.average
+def predict(G,tMax,p,initialA,initialB,method='dmp'):
+    if method not in METHODS:
+        raise ValueError("Unknown method: "+str(method))
+    adjacency,nodes,index=en.graphToCSR(G)
+    initialA=np.asarray(initialA,dtype=float)
+    initialB=np.asarray(initialB,dtype=float)
+    adopted=METHODS[method](adjacency.astype(np.float64),tMax,p,initialA,initialB)
+    inGroupB=initialB.sum()
+    return np.column_stack([len(nodes)-inGroupB-adopted,adopted,np.full(tMax+1,inGroupB)]).tolist()
+
+#initial probabilities of the given groups, nodes in both groups belong to groupA as in the engines
+def groupProbabilities(G,groupA,groupB):
+    adjacency,nodes,index=en.graphToCSR(G)
+    state=en.initialState(index,groupA,groupB)
+    return (state==en.GROUP_A).astype(float),(state==en.GROUP_B).astype(float)
+
+#same initial conditions as fullyRandomExperiment: every node is in groupA with probability sizeGroupA/N and in groupB with probability sizeGroupB/N
+def fullyRandomPrediction(G,tMax,probability,sizeGroupA,sizeGroupB,method='dmp'):
+    size=len(G)
+    return predict(G,tMax,probability,np.full(size,sizeGroupA/size),np.full(size,sizeGroupB/size),method)
+
+#same initial conditions as halfRandomExperimentA: groupA is given and groupB is drawn among the other nodes
+def halfRandomPredictionA(G,tMax,probability,groupA,sizeGroupB,method='dmp'):
+    initialA,initialB=groupProbabilities(G,groupA,[])
+    initialB=(1-initialA)*sizeGroupB/(len(initialA)-initialA.sum())
+    return predict(G,tMax,probability,initialA,initialB,method)
+
+#same initial conditions as halfRandomExperimentB: groupB is given and groupA is drawn among the other nodes
+def halfRandomPredictionB(G,tMax,probability,groupB,sizeGroupA,method='dmp'):
+    initialA,initialB=groupProbabilities(G,[],groupB)
+    initialA=(1-initialB)*sizeGroupA/(len(initialB)-initialB.sum())
+    return predict(G,tMax,probability,initialA,initialB,method)
@@ -0,0 +1,235 @@
+import aggregation as agg
+import engine as en
+import numpy as np
+from scipy.sparse import csr_array
+from scipy.sparse.csgraph import dijkstra
+
+#sampled realisations of the dynamics of halfRandomExperimentB used to score vaccination sets.
+#each attempt of the engines is an independent trial, so in a run an adopter m convinces its neighbour n after a Geometric(p) delay
+#and a node adopts at the earliest time over its neighbours of (adoption time of m + delay of m->n): the final adopters are the nodes
+#within distance tMax of groupA when the delays are the edge weights. A world fixes the delay of every directed edge and a random
+#order of the nodes, groupA being the first sizeGroupA nodes of that order outside groupB, so every candidate set is scored on the same
+#randomness (common random numbers) and the score of a set is a deterministic function of it
+class VaccinationWorlds:
+    def __init__(self,G,tMax,p,sizeGroupA,worlds=32,seed=None):
+        rng=np.random.default_rng(seed)
+        adjacency,nodes,index=en.graphToCSR(G)
+        adjacency=adjacency.sorted_indices()
+        size=len(nodes)
+        self.nodes=nodes
+        self.index=index
+        self.indptr=adjacency.indptr
+        self.indices=adjacency.indices
+        #entry reverse[e] of the CSR arrays is the edge opposite to entry e
+        rows=np.repeat(np.arange(size,dtype=np.int64),np.diff(self.indptr))
+        self.reverse=np.searchsorted(rows*size+self.indices,self.indices.astype(np.int64)*size+rows)
+        self.tMax=tMax
+        self.sizeGroupA=sizeGroupA
+        self.inGroupB=np.zeros(size,dtype=bool)
+        #position of the nodes of the subgraph of an incremental evaluation, -1 elsewhere
+        self.local=np.full(size,-1,dtype=np.int64)
+        #delays longer than tMax never matter, so p=0 is an edge that never transmits
+        self.delays=[]
+        for w in range(worlds):
+            delays=rng.geometric(p,adjacency.nnz).astype(np.float64) if p>0 else np.full(adjacency.nnz,tMax+1.0)
+            self.delays.append(csr_array((delays,self.indices,self.indptr),shape=adjacency.shape))
+        self.orders=[rng.permutation(size) for w in range(worlds)]
+        self.groupsA=[self.groupA(w,self.inGroupB) for w in range(worlds)]
+        self.finals=np.zeros(worlds,dtype=np.int64)
+        self.trees=[None]*worlds
+        for w in range(worlds):
+            self.refresh(w)
+
+    #rows of groupA in world w when the nodes of inGroupB are vaccinated
+    def groupA(self,w,inGroupB):
+        order=self.orders[w]
+        return order[~inGroupB[order]][:self.sizeGroupA]
+
+    #distance of every node from groupA in world w (inf beyond tMax) and its predecessor on a shortest path
+    def distances(self,w,groupA,predecessors=False):
+        return dijkstra(self.delays[w],indices=groupA,min_only=True,limit=self.tMax,return_predecessors=predecessors)
+
+    #final number of adopters in world w, the vaccinated nodes have their outgoing delays set beyond tMax so they never transmit
+    def final(self,w,groupA,inGroupB):
+        distances=self.distances(w,groupA)
+        return int(np.count_nonzero(np.isfinite(distances)&~inGroupB))
+
+    #recomputes the final adoption of world w and its shortest-path forest: the distances, the children of every node (as CSR arrays)
+    #and the number of adopters in the subtree of every node
+    def refresh(self,w):
+        distances,predecessors,sources=self.distances(w,self.groupsA[w],predecessors=True)
+        reached=np.isfinite(distances)
+        self.finals[w]=np.count_nonzero(reached&~self.inGroupB)
+        subtree=(reached&~self.inGroupB).astype(np.float64)
+        children=np.flatnonzero(reached&(predecessors>=0))
+        #add every node to its predecessor, from the farthest nodes to the closest ones (delays are integers >=1)
+        rows=children[np.argsort(-distances[children],kind='stable')]
+        for level in np.split(rows,np.flatnonzero(np.diff(distances[rows]))+1):
+            np.add.at(subtree,predecessors[level],subtree[level])
+        children=children[np.argsort(predecessors[children],kind='stable')]
+        childPtr=np.concatenate(([0],np.cumsum(np.bincount(predecessors[children],minlength=len(self.nodes)))))
+        self.trees[w]=(distances,childPtr,children,subtree)
+
+    #expected final number of adopters with the current groupB
+    def expectedFinal(self):
+        return float(self.finals.mean())
+
+    #final number of adopters of every world if the given rows were vaccinated besides the current groupB, the worlds are left unchanged
+    def evaluate(self,rows):
+        inGroupB=self.inGroupB.copy()
+        inGroupB[rows]=True
+        entries=np.flatnonzero(np.repeat(inGroupB,np.diff(self.indptr)))
+        finals=[]
+        for w in range(len(self.delays)):
+            saved=self.delays[w].data[entries].copy()
+            self.delays[w].data[entries]=self.tMax+1
+            finals.append(self.final(w,self.groupA(w,inGroupB),inGroupB))
+            self.delays[w].data[entries]=saved
+        return np.array(finals)
+
+    #upper bound of the gain of vaccinating each node, for all the nodes at once: in every world only the adopters whose shortest path
+    #from groupA goes through v can be saved by vaccinating v, so the gain is at most the size of the subtree of v in the shortest-path
+    #forest. Vaccinating a node of groupA replaces it with another seed, so its gain is bounded by all the adopters of the world
+    def bounds(self):
+        bounds=np.zeros(len(self.nodes))
+        for w in range(len(self.delays)):
+            subtree=self.trees[w][3].copy()
+            subtree[self.groupsA[w]]=self.finals[w]
+            bounds+=subtree
+        bounds/=len(self.delays)
+        bounds[self.inGroupB]=-np.inf
+        return bounds
+
+    #block the outgoing edges of row v in every world
+    def block(self,v):
+        for delays in self.delays:
+            delays.data[self.indptr[v]:self.indptr[v+1]]=self.tMax+1
+
+    #number of adopters of world w that vaccinating row v (not in groupA) saves. Only the nodes of the subtree of v can lose their
+    #shortest path, so they are the only ones recomputed: a Dijkstra on the subtree where a virtual source reaches every node
+    #at its earliest time through the unaffected nodes
+    def subtreeGain(self,w,v):
+        distances,childPtr,children,subtree=self.trees[w]
+        if not np.isfinite(distances[v]):
+            return 0
+        affected=[]
+        frontier=np.array([v])
+        while frontier.size:
+            frontier=en.neighbourIndices(childPtr,children,frontier)
+            affected.append(frontier)
+        affected=np.concatenate(affected)
+        affected=affected[~self.inGroupB[affected]]
+        if affected.size==0:
+            return 1
+        self.local[affected]=np.arange(affected.size)
+        starts=self.indptr[affected]
+        lengths=self.indptr[affected+1]-starts
+        entries=np.repeat(starts-np.cumsum(lengths)+lengths,lengths)+np.arange(lengths.sum())
+        target=np.repeat(np.arange(affected.size),lengths)
+        source=self.indices[entries]
+        delay=self.delays[w].data[self.reverse[entries]]
+        inside=self.local[source]
+        outside=(inside<0)&(source!=v)&~self.inGroupB[source]
+        earliest=np.full(affected.size,np.inf)
+        np.minimum.at(earliest,target[outside],distances[source[outside]]+delay[outside])
+        internal=inside>=0
+        entry=np.flatnonzero(earliest<=self.tMax)
+        graph=csr_array((np.concatenate([delay[internal],earliest[entry]]),
+                         (np.concatenate([inside[internal],np.full(entry.size,affected.size)]),np.concatenate([target[internal],entry]))),
+                        shape=(affected.size+1,affected.size+1))
+        reached=np.count_nonzero(np.isfinite(dijkstra(graph,indices=affected.size,limit=self.tMax)[:affected.size]))
+        self.local[affected]=-1
+        return affected.size+1-reached
+
+    #gain of vaccinating row v in world w
+    def worldGain(self,w,v):
+        if v not in self.groupsA[w]:
+            return self.subtreeGain(w,v)
+        saved=self.delays[w].data[self.indptr[v]:self.indptr[v+1]].copy()
+        self.delays[w].data[self.indptr[v]:self.indptr[v+1]]=self.tMax+1
+        self.inGroupB[v]=True
+        gain=self.finals[w]-self.final(w,self.groupA(w,self.inGroupB),self.inGroupB)
+        self.inGroupB[v]=False
+        self.delays[w].data[self.indptr[v]:self.indptr[v+1]]=saved
+        return gain
+
+    #expected reduction of the final adoption obtained by vaccinating row v. The worlds are evaluated from the one with the largest bound,
+    #and as soon as the gains so far plus the bounds of the remaining worlds cannot exceed threshold that upper bound is returned instead
+    def gain(self,v,threshold=-np.inf):
+        bounds=np.array([self.finals[w] if v in self.groupsA[w] else self.trees[w][3][v] for w in range(len(self.delays))])
+        remaining=bounds.sum()
+        total=0
+        for w in np.argsort(-bounds,kind='stable'):
+            if (total+remaining)/len(self.delays)<=threshold:
+                break
+            total+=self.worldGain(w,v)
+            remaining-=bounds[w]
+        return (total+remaining)/len(self.delays)
+
+    #vaccinates row v
+    def add(self,v):
+        self.block(v)
+        self.inGroupB[v]=True
+        for w in range(len(self.delays)):
+            if v in self.groupsA[w]:
+                self.groupsA[w]=self.groupA(w,self.inGroupB)
+            self.refresh(w)
+
+#greedy choice of the k nodes of groupB minimising the expected final adoption of halfRandomExperimentB(G,tMax,p,groupB,sizeGroupA),
+#estimated on the given number of sampled worlds (see VaccinationWorlds), starting from the nodes of groupB if any.
+#every round the gain of each node is bounded from above in one pass (VaccinationWorlds.bounds) and the candidates are then simulated
+#lazily in decreasing order of their bound, as in CELF, until the best simulated gain is at least the next bound; a candidate is also
+#dropped as soon as its remaining worlds cannot beat the best gain. The bounds are recomputed every round instead of reusing the gains
+#of the earlier rounds, which CELF can only do for submodular objectives while removing nodes of a scale-free graph has strongly
+#complementary effects. The greedy choice fits the sampled worlds, so it is checked on validationWorlds independent worlds against the
+#k nodes of highest degree with a one-sided paired t-test at the given confidence (both sets are scored on the same worlds).
+#Returns the greedy groupB and a report with the expected final adoption on the sampled worlds after each addition, the expected
+#final adoption of the greedy and of the degree sets on the validation worlds, the degree set, and whether the greedy set is
+#significantly better
+def greedyVaccination(G,k,tMax,p,sizeGroupA,worlds=128,validationWorlds=512,confidence=0.95,seed=None,groupB=()):
+    import centrality as cen
+    trainingSeed,validationSeed=np.random.SeedSequence(seed).spawn(2)
+    state=VaccinationWorlds(G,tMax,p,sizeGroupA,worlds,trainingSeed)
+    for n in groupB:
+        state.add(state.index[n])
+    chosen=list(groupB)
+    expected=[]
+    for r in range(k):
+        bounds=state.bounds()
+        best,bestGain,simulated=None,-np.inf,0
+        for v in np.argsort(-bounds,kind='stable'):
+            if bounds[v]<=bestGain or not np.isfinite(bounds[v]):
+                break
+            gain=state.gain(v,bestGain)
+            simulated+=1
+            if gain>bestGain:
+                best,bestGain=v,gain
+        if best is None:
+            break
+        state.add(best)
+        chosen.append(state.nodes[best])
+        expected.append(state.expectedFinal())
+        print("Vaccinated:",len(chosen),"expected adopters:",expected[-1],"candidates simulated:",simulated)
+    validation=VaccinationWorlds(G,tMax,p,sizeGroupA,validationWorlds,validationSeed)
+    ranking=list(groupB)+[n for n in cen.topNodes(G,'degree',len(groupB)+k) if n not in set(groupB)][:k]
+    greedyFinals=validation.evaluate([validation.index[n] for n in chosen])
+    degreeFinals=validation.evaluate([validation.index[n] for n in ranking])
+    print("Validation: greedy",greedyFinals.mean(),"degree",degreeFinals.mean())
+    differences=degreeFinals-greedyFinals
+    error=differences.std(ddof=1)/np.sqrt(len(differences)) if len(differences)>1 else np.inf
+    report={'expected':expected,
+            'greedyFinal':float(greedyFinals.mean()),
+            'degreeFinal':float(degreeFinals.mean()),
+            'degreeGroupB':ranking,
+            'better':bool(differences.mean()>agg.tQuantile(confidence,max(len(differences)-1,1))*error)}
+    return chosen,report
+
+#greedyVaccination falling back to the k nodes of highest degree when the greedy set is not significantly better on the validation
+#worlds. Returns the recommended groupB and the report of greedyVaccination, whose 'chosen' entry says which set it is ('greedy' or 'degree')
+def validatedVaccination(G,k,tMax,p,sizeGroupA,worlds=128,validationWorlds=512,confidence=0.95,seed=None,groupB=()):
+    chosen,report=greedyVaccination(G,k,tMax,p,sizeGroupA,worlds,validationWorlds,confidence,seed,groupB)
+    if report['better']:
+        report['chosen']='greedy'
+        return chosen,report
+    report['chosen']='degree'
+    return report['degreeGroupB'],report
@@ -0,0 +1,95 @@
+import engine as en
+import graphstore as gs
+import os
+import numpy as np
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+#graph attached by each worker process, the shared memory blocks that back it and its networkx view for the 'graph' engine
+_graph=None
+_blocks=[]
+_networkx=None
+
+#engines that parallelExperiments can run
+ENGINES=('graph','array','frontier')
+
+#copies the CSR arrays of G into shared memory blocks, returns the blocks and the (name,shape,dtype) description used by the workers to attach
+def shareGraph(G):
+    adjacency,nodes,index=en.graphToCSR(G)
+    blocks=[]
+    spec=[]
+    for array in (adjacency.indptr,adjacency.indices,adjacency.data):
+        block=shared_memory.SharedMemory(create=True,size=max(array.nbytes,1))
+        np.ndarray(array.shape,dtype=array.dtype,buffer=block.buf)[:]=array
+        blocks.append(block)
+        spec.append((block.name,array.shape,array.dtype.str))
+    return blocks,spec
+
+#releases the shared memory blocks created by shareGraph
+def releaseGraph(blocks):
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+#worker initializer: maps the shared CSR arrays without copying them
+def attachGraph(spec):
+    global _graph
+    arrays=[]
+    for name,shape,dtype in spec:
+        block=shared_memory.SharedMemory(name=name)
+        _blocks.append(block)
+        arrays.append(np.ndarray(shape,dtype=dtype,buffer=block.buf))
+    indptr,indices,data=arrays
+    _graph=en.CSRGraph(indptr,indices,data=data)
+
+#worker initializer: maps the graph file written by graphstore.saveGraph, the rows are used as node labels as in attachGraph
+def attachFile(filename):
+    global _graph
+    G=gs.loadGraph(filename)
+    _graph=en.CSRGraph(G.indptr,G.indices,data=G.adjacency.data)
+
+#returns the graph attached by attachGraph or attachFile in this worker process
+def attachedGraph():
+    return _graph
+
+#runs one replica on the attached graph, the groups are given as row indices. The 'graph' engine walks a networkx graph and seeds a
+#random.Random, so it runs on a networkx copy of the attached graph (built once per worker) with an integer drawn from the seed
+def runReplica(task):
+    global _networkx
+    groupA,groupB,tMax,probability,engine,seed=task
+    if engine=='graph':
+        if _networkx is None:
+            _networkx=_graph.toNetworkx()
+        return en.runModel(_networkx,tMax,groupA,groupB,probability,engine=engine,seed=int(seed.generate_state(1)[0])).data
+    return en.runModel(_graph,tMax,groupA,groupB,probability,engine=engine,seed=seed).data
+
+#parallel version of repeatedExperiments: the initial groups of each replica are drawn with seeds(G,forthArgument,fifthArgument,rng)
+#as in batchedExperiments, and the replicas are run by a pool of worker processes that share a single copy of the CSR adjacency of G.
+#every replica gets its own seed spawned from the master seed, so for a given seed the result is the same whatever the number of workers.
+#engine is one of ENGINES (see engine.runModel). Returns a dictionary as the one produced by repeatedExperiments
+def parallelExperiments(seeds,G,tMax,probability,forthArgument,fifthArgument,experimentsNumber,seed=None,workers=None,engine='frontier'):
+    if engine not in ENGINES:
+        raise ValueError("Unknown engine: "+str(engine))
+    adjacency,nodes,index=en.graphToCSR(G)
+    tasks=[]
+    for replicaSeed in np.random.SeedSequence(seed).spawn(experimentsNumber):
+        samplingSeed,runSeed=replicaSeed.spawn(2)
+        groupA,groupB=seeds(G,forthArgument,fifthArgument,np.random.default_rng(samplingSeed))
+        tasks.append(([index[n] for n in groupA],[index[n] for n in groupB],tMax,probability,engine,runSeed))
+    workers=workers or os.cpu_count()
+    #a graph mapped from a file is mapped again by every worker, any other graph is copied once into shared memory
+    if isinstance(G,en.CSRGraph) and G.filename is not None:
+        blocks,initializer,initargs=[],attachFile,(G.filename,)
+    else:
+        blocks,spec=shareGraph(G)
+        initializer,initargs=attachGraph,(spec,)
+    data={}
+    try:
+        with ProcessPoolExecutor(workers,initializer=initializer,initargs=initargs) as pool:
+            chunksize=max(1,experimentsNumber//(4*workers))
+            for n,result in enumerate(pool.map(runReplica,tasks,chunksize=chunksize)):
+                data[n]=result
+                print("Experiment:", n, "done.")
+    finally:
+        releaseGraph(blocks)
+    return data
@@ -0,0 +1,78 @@
+import engine as en
+import weakref
+import numpy as np
+
+#cache of the NodeSampler of each graph, dropped automatically when the graph is garbage collected
+_samplerCache=weakref.WeakKeyDictionary()
+
+#draws groups of distinct nodes from a graph, working on the row indices of the CSR adjacency of engine.graphToCSR
+#the node array, the degrees and the degree strata are computed once per graph
+class NodeSampler:
+    def __init__(self,G,strata=4):
+        adjacency,nodes,index=en.graphToCSR(G)
+        self.nodes=nodes
+        self.index=index
+        self.size=len(nodes)
+        self.degrees=np.diff(adjacency.indptr)
+        #nodes grouped in strata of (roughly) equal size by increasing degree
+        self.strata=np.array_split(np.argsort(self.degrees,kind='stable'),strata)
+
+    #row indices of the nodes of exclude that are in the graph
+    def excludedRows(self,exclude):
+        return np.array([self.index[n] for n in exclude if n in self.index],dtype=np.int64)
+
+    #k distinct rows drawn uniformly among rows without the rows in excluded, in O(k+len(excluded)):
+    #k+len(excluded) distinct rows are drawn and the first k that are not excluded are kept
+    def uniformRows(self,k,excluded,rng,rows=None):
+        size=self.size if rows is None else len(rows)
+        drawn=rng.choice(size,size=min(size,k+len(excluded)),replace=False)
+        if rows is not None:
+            drawn=rows[drawn]
+        return drawn[~np.isin(drawn,excluded)][:k]
+
+    #k distinct rows drawn with probability proportional to the degree (Efraimidis-Spirakis exponential keys)
+    def degreeRows(self,k,excluded,rng):
+        keys=rng.exponential(size=self.size)/np.maximum(self.degrees,1e-12)
+        keys[self.degrees==0]=np.inf
+        keys[excluded]=np.inf
+        rows=np.argpartition(keys,k-1)[:k] if k<self.size else np.arange(self.size)
+        return rows[np.isfinite(keys[rows])]
+
+    #k distinct rows drawn uniformly inside each degree stratum, each stratum contributing in proportion to its size
+    def stratifiedRows(self,k,excluded,rng):
+        available=[stratum[~np.isin(stratum,excluded)] for stratum in self.strata]
+        sizes=np.array([len(stratum) for stratum in available])
+        quota=k*sizes/max(sizes.sum(),1)
+        counts=np.floor(quota).astype(int)
+        #largest remainder rounding of the quotas
+        counts[np.argsort(counts-quota)[:k-counts.sum()]]+=1
+        return np.concatenate([self.uniformRows(count,[],rng,stratum) for count,stratum in zip(counts,available)])
+
+    #returns a list of k distinct nodes not in exclude, or None if there are not enough of them
+    #method is 'uniform', 'degree' (probability proportional to the degree) or 'stratified' (by degree strata)
+    def sample(self,k,exclude=(),rng=None,method='uniform'):
+        rng=np.random.default_rng(rng)
+        excluded=self.excludedRows(exclude)
+        if self.size-len(np.unique(excluded))<k:
+            return None
+        if method=='uniform':
+            rows=self.uniformRows(k,excluded,rng)
+        elif method=='degree':
+            rows=self.degreeRows(k,excluded,rng)
+        elif method=='stratified':
+            rows=self.stratifiedRows(k,excluded,rng)
+        else:
+            raise ValueError("Unknown sampling method: "+str(method))
+        if len(rows)<k:
+            return None
+        return [self.nodes[i] for i in rows.tolist()]
+
+#returns the NodeSampler of G, built at the first call and recomputed whenever the nodes or the edges of G change, as the CSR cache
+#of engine.graphToCSR (a CSRGraph never changes). refresh=True rebuilds it anyway
+def nodeSampler(G,refresh=False):
+    key=None if isinstance(G,en.CSRGraph) else en.adjacencyKey(G)
+    cached=_samplerCache.get(G)
+    if refresh or cached is None or cached[0]!=key:
+        cached=(key,NodeSampler(G))
+        _samplerCache[G]=cached
+    return cached[1]
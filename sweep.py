@@ -0,0 +1,138 @@
+import experiments as exp
+import generators as gen
+import numpy as np
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+#value of every parameter of a sweep cell that is not given in the grid
+DEFAULTS={
+    'model':'powerlaw',
+    'N':1000,
+    'gamma':2.5,
+    'meanDegree':1.5,
+    'probability':0.5,
+    'sizeGroupA':5,
+    'sizeGroupB':5,
+    'strategy':'random',
+}
+
+#parameters that define the graph of a cell, for each graph model
+GRAPH_PARAMETERS={
+    'er':('model','N','meanDegree'),
+    'powerlaw':('model','N','gamma'),
+}
+
+#vaccination strategies returning the k nodes of groupB of a graph, centrality (and networkx with it) is only imported when they are used
+#seed fixes the pivots of the sampled betweenness estimators, so the same seed always vaccinates the same nodes
+def degreeStrategy(G,k,seed=None):
+    import centrality as cen
+    return cen.topNodes(G,'degree',k)
+
+def betweennessStrategy(G,k,seed=None):
+    import centrality as cen
+    return cen.topBetweenness(G,k,seed=seed)
+
+#adaptive strategies: the ranking is updated after every node vaccinated, see centrality.DegreeBucketQueue and centrality.AdaptiveBetweenness
+def adaptiveDegreeStrategy(G,k,seed=None):
+    import centrality as cen
+    return cen.topNodes(G,'adaptiveDegree',k)
+
+def adaptiveBetweennessStrategy(G,k,seed=None):
+    import centrality as cen
+    return cen.adaptiveTopBetweenness(G,k,seed=seed)
+
+#vaccination strategies: None draws groupB at random, the others return the sizeGroupB nodes of groupB of a graph
+STRATEGIES={
+    'random':None,
+    'degree':degreeStrategy,
+    'betweenness':betweennessStrategy,
+    'adaptiveDegree':adaptiveDegreeStrategy,
+    'adaptiveBetweenness':adaptiveBetweennessStrategy,
+}
+
+#parameters of a cell without the ones its graph model does not use (gamma for 'er', meanDegree for 'powerlaw')
+def normaliseCell(cell):
+    unused={'gamma','meanDegree'}-set(GRAPH_PARAMETERS[cell['model']])
+    return {name:value for name,value in cell.items() if name not in unused}
+
+#all the distinct cells of grid, a dictionary parameter->list of values (missing parameters take their DEFAULTS value)
+#cells are ordered by graph, so consecutive cells of a worker reuse the cached centrality rankings
+def expandGrid(grid):
+    names=list(DEFAULTS)
+    values=[grid.get(name,[DEFAULTS[name]]) for name in names]
+    cells={}
+    for combination in itertools.product(*values):
+        cell=normaliseCell(dict(zip(names,combination)))
+        cells[json.dumps(cell,sort_keys=True)]=cell
+    return sorted(cells.values(),key=lambda cell: json.dumps(graphParameters(cell),sort_keys=True))
+
+def graphParameters(cell):
+    return {name:cell[name] for name in GRAPH_PARAMETERS[cell['model']]}
+
+#hexadecimal key of the given parameters and master seed, also used to derive the random seeds of a cell
+def parametersKey(parameters,seed):
+    return hashlib.sha1(json.dumps([parameters,seed],sort_keys=True).encode()).hexdigest()
+
+#file of the store holding the result of a cell, the key covers the length and number of replicas of the runs as well as the cell
+def cellPath(directory,cell,seed,tMax,replicas):
+    return os.path.join(directory,parametersKey(dict(cell,tMax=tMax,replicas=replicas),seed)+".npz")
+
+#builds the graph of a cell, the same graph parameters and master seed always give the same graph
+def buildGraph(cell,seed):
+    graphSeed=int(parametersKey(graphParameters(cell),seed),16)
+    if cell['model']=='er':
+        return gen.gnpGraph(cell['N'],cell['meanDegree']/cell['N'],graphSeed)
+    return gen.powerLawGraph(cell['N'],cell['gamma'],graphSeed)
+
+#runs the replicas of a cell and writes them to the store, the file is renamed into place only once complete
+#so a crash never leaves a partial result behind
+def runCell(task):
+    cell,directory,tMax,replicas,seed=task
+    G=buildGraph(cell,seed)
+    runSeed=int(parametersKey(cell,seed),16)
+    strategy=STRATEGIES[cell['strategy']]
+    if strategy is None:
+        data=exp.batchedExperiments(exp.fullyRandomSeeds,G,tMax,cell['probability'],cell['sizeGroupA'],cell['sizeGroupB'],replicas,runSeed)
+    else:
+        #the seed of the strategy only depends on the graph and the strategy, so the cells of a graph that only differ in the dynamics
+        #vaccinate the same nodes
+        strategySeed=int(parametersKey(dict(graphParameters(cell),strategy=cell['strategy']),seed),16)
+        groupB=strategy(G,cell['sizeGroupB'],strategySeed)
+        data=exp.batchedExperiments(exp.halfRandomSeedsB,G,tMax,cell['probability'],groupB,cell['sizeGroupA'],replicas,runSeed)
+    path=cellPath(directory,cell,seed,tMax,replicas)
+    temporary=path+".tmp.npz"
+    np.savez_compressed(temporary,data=data.astype(np.int32),parameters=json.dumps(cell,sort_keys=True),seed=seed,tMax=tMax,replicas=replicas)
+    os.replace(temporary,path)
+    return cell
+
+#runs every cell of grid that is not already in the store directory, spreading them across worker processes
+#running the same sweep again (for instance after a crash) only computes the missing cells, a cell run with another tMax or number of
+#replicas is not reused. Returns the list of all the cells
+def runSweep(grid,directory,tMax=50,replicas=20,seed=0,workers=1):
+    os.makedirs(directory,exist_ok=True)
+    cells=expandGrid(grid)
+    pending=[cell for cell in cells if not os.path.exists(cellPath(directory,cell,seed,tMax,replicas))]
+    print("Sweep:",len(cells),"cells,",len(cells)-len(pending),"already done.")
+    tasks=[(cell,directory,tMax,replicas,seed) for cell in pending]
+    if workers>1:
+        with ProcessPoolExecutor(workers) as pool:
+            for cell in pool.map(runCell,tasks):
+                print("Cell:",cell,"done.")
+    else:
+        for task in tasks:
+            print("Cell:",runCell(task),"done.")
+    return cells
+
+#returns the (parameters, seed, data) of every cell in the store directory, data has shape (replicas,tMax+1,3)
+#if tMax or replicas are given only the cells run with those values are returned, as a directory can hold several sweeps
+def loadSweep(directory,tMax=None,replicas=None):
+    results=[]
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".npz") and not name.endswith(".tmp.npz"):
+            with np.load(os.path.join(directory,name)) as stored:
+                if (tMax is None or int(stored['tMax'])==tMax) and (replicas is None or int(stored['replicas'])==replicas):
+                    results.append((json.loads(str(stored['parameters'])),int(stored['seed']),stored['data']))
+    return results
@@ -0,0 +1,33 @@
+import experiments as exp
+import networkx as nx
+import random
+
+#a five-argument experiment written before the runners passed a generator
+def fiveArgumentExperiment(G,tMax,probability,sizeGroupA,sizeGroupB):
+    groupA=random.sample(list(G),sizeGroupA)
+    groupB=random.sample([n for n in G if n not in groupA],sizeGroupB)
+    return exp.en.graphModelRun(G,tMax,groupA,groupB,probability,writeAttributes=False)
+
+def test_repeatedExperimentsAcceptsFiveArgumentExperiments():
+    G=nx.path_graph(20)
+    data=exp.repeatedExperiments(fiveArgumentExperiment,G,5,0.5,2,2,3,seed=0)
+    assert len(data)==3
+    assert all(len(run)==6 for run in data.values())
+
+def test_streamedExperimentsAcceptsFiveArgumentExperiments():
+    G=nx.path_graph(20)
+    accumulator=exp.streamedExperiments(fiveArgumentExperiment,G,5,0.5,2,2,3,seed=0)
+    assert accumulator.count==3
+
+def test_repeatedExperimentsIsReproducibleWithASeed():
+    G=nx.path_graph(50)
+    first=exp.repeatedExperiments(exp.halfRandomExperimentB,G,10,0.5,[0,1],3,4,seed=1)
+    second=exp.repeatedExperiments(exp.halfRandomExperimentB,G,10,0.5,[0,1],3,4,seed=1)
+    assert first==second
+
+def test_adaptiveExperimentsIsReproducibleWithASeed():
+    G=nx.barabasi_albert_graph(200,2,seed=0)
+    runs=[exp.adaptiveExperiments(exp.fullyRandomSeeds,G,10,0.5,3,3,5,runner=exp.batchedExperiments,maxReplicas=60,seed=4)
+          for n in range(2)]
+    assert runs[0][1]['replicas']==runs[1][1]['replicas']
+    assert (runs[0][0].mean==runs[1][0].mean).all()
@@ -0,0 +1,15 @@
+import generators as gen
+import optimizer as opt
+
+def test_greedyVaccinationReturnsTheGreedySet():
+    G=gen.powerLawGraph(300,2.5,1)
+    chosen,report=opt.greedyVaccination(G,3,20,0.4,3,worlds=16,validationWorlds=16,seed=0)
+    assert len(chosen)==3 and len(report['expected'])==3
+    assert 'chosen' not in report
+
+def test_validatedVaccinationSaysWhichSetItReturns():
+    G=gen.powerLawGraph(300,2.5,1)
+    greedy,report=opt.greedyVaccination(G,3,20,0.4,3,worlds=16,validationWorlds=16,seed=0)
+    chosen,validated=opt.validatedVaccination(G,3,20,0.4,3,worlds=16,validationWorlds=16,seed=0)
+    assert chosen==(greedy if validated['chosen']=='greedy' else validated['degreeGroupB'])
+    assert validated['chosen']==('greedy' if report['better'] else 'degree')
@@ -0,0 +1,16 @@
+import experiments as exp
+import parallel as par
+import networkx as nx
+import pytest
+
+@pytest.mark.parametrize('engine',par.ENGINES)
+def test_parallelExperimentsRunsEveryEngine(engine):
+    G=nx.barabasi_albert_graph(200,2,seed=0)
+    first=par.parallelExperiments(exp.fullyRandomSeeds,G,10,0.5,3,3,4,seed=1,workers=2,engine=engine)
+    second=par.parallelExperiments(exp.fullyRandomSeeds,G,10,0.5,3,3,4,seed=1,workers=1,engine=engine)
+    assert first==second
+    assert all(len(run)==11 and sum(run[0])==200 for run in first.values())
+
+def test_parallelExperimentsRejectsUnknownEngines():
+    with pytest.raises(ValueError):
+        par.parallelExperiments(exp.fullyRandomSeeds,nx.path_graph(10),5,0.5,1,1,2,engine='gpu')
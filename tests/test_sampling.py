@@ -0,0 +1,12 @@
+import sampling as smp
+import networkx as nx
+
+def test_nodeSamplerFollowsReplacedNodes():
+    G=nx.path_graph(10)
+    smp.nodeSampler(G)
+    #same number of nodes, but node 9 is replaced by node 10
+    G.remove_node(9)
+    G.add_edge(8,10)
+    for seed in range(20):
+        sample=smp.nodeSampler(G).sample(10,rng=seed)
+        assert set(sample)==set(G)
@@ -0,0 +1,40 @@
+import engine as en
+import layout as lay
+import visualizer as viz
+import networkx as nx
+import numpy as np
+
+def test_fullModeColoursFollowTheNodesOfHistory():
+    G=nx.path_graph(5)
+    data,history=en.arrayModelRun(G,3,[0],[4],1.0,seed=0,history=True)
+    #positions listed in another order than the nodes of the graph
+    positions={n:(float(n),0.0) for n in reversed(list(G))}
+    fig=viz.graphDynamicFigure(G,data,positions,"test",history)
+    last=fig['frames'][-1]['data'][1]
+    colours=dict(zip(last['x'],last['marker']['color']))
+    assert colours[0.0]==viz.STATE_COLOURS[en.GROUP_A]
+    assert colours[4.0]==viz.STATE_COLOURS[en.GROUP_B]
+
+def test_defaultCacheStoresLayoutsOnDisk(tmp_path,monkeypatch):
+    monkeypatch.setattr(lay.defaultCache,'directory',str(tmp_path))
+    G=nx.cycle_graph(12)
+    coordinates=lay.defaultCache.coordinates(G)
+    assert len(list(tmp_path.iterdir()))==1
+    assert np.allclose(lay.LayoutCache(directory=str(tmp_path)).coordinates(G),coordinates)
+
+def test_deltaFramesReplayToTheStateOfEveryStep():
+    G=nx.path_graph(8)
+    data,history=en.arrayModelRun(G,6,[0],[7],1.0,seed=0,history=True)
+    positions={n:(float(n),0.0) for n in G}
+    fig=viz.deltaDynamicFigure(G,data,positions,"test",history)
+    layers=len(fig['data'])-2
+    assert all(len(frame['traces'])<=1 for frame in fig['frames'][1:])
+    steps=fig['layout']['sliders'][0]['steps']
+    frames={frame['name']:frame for frame in fig['frames']}
+    for k,step in enumerate(steps):
+        visible=[trace.get('visible',True) for trace in fig['data']]
+        for name in step['args'][0]:
+            for trace,update in zip(frames[name]['traces'],frames[name]['data']):
+                visible[trace]=update['visible']
+        shown=np.isin(history.times,[t for t in range(1,k+1)])
+        assert sum(len(fig['data'][2+i]['x']) for i in range(layers) if visible[2+i])==shown.sum()
@@ -0,0 +1,140 @@
+import engine as en
+import numpy as np
+from scipy.sparse import csr_array
+from scipy.sparse.csgraph import dijkstra
+
+#transmission probability at which groupA takes over a graph, found by bisection on coupled replicas instead of a sweep over the
+#probability. As in optimizer.VaccinationWorlds, a run of the engines is a first-passage percolation where the edge m->n has a
+#Geometric(p) delay, and the nodes adopting A by tMax are the ones within distance tMax of groupA. A replica fixes its groups and one
+#uniform number u per directed edge, and its delays at any p are ceil(log(u)/log(1-p)): they decrease with p, so the final adoption of
+#the replica increases with p and every probe of the bisection reuses the same replicas. Each replica then has its own threshold,
+#the smallest p at which it takes over, and the threshold of the graph is a quantile of these
+
+#quantiles of the thresholds of the replicas already bisected that are probed first in the bisection of a new replica
+GUESS_QUANTILES=(0.1,0.9)
+
+#replicas of the dynamics on G coupled across the transmission probabilities, the groups of each replica are drawn with
+#seeds(G,forthArgument,fifthArgument,rng) as in batchedExperiments
+class CoupledReplicas:
+    def __init__(self,G,tMax,seeds,forthArgument,fifthArgument,seed=None):
+        adjacency,nodes,index=en.graphToCSR(G)
+        self.G=G
+        self.index=index
+        self.indptr=adjacency.indptr
+        self.indices=adjacency.indices
+        self.size=len(nodes)
+        self.tMax=tMax
+        self.seeds=seeds
+        self.forthArgument=forthArgument
+        self.fifthArgument=fifthArgument
+        self.seedSequence=np.random.SeedSequence(seed)
+        self.rng=np.random.default_rng(self.seedSequence.spawn(1)[0])
+        #rows of groupA, rows of groupB and seed of the uniform numbers of every replica
+        self.replicas=[]
+        self.evaluations=0
+
+    def __len__(self):
+        return len(self.replicas)
+
+    #draws count more replicas
+    def add(self,count):
+        for replicaSeed in self.seedSequence.spawn(count):
+            groupA,groupB=self.seeds(self.G,self.forthArgument,self.fifthArgument,self.rng)
+            #nodes in both groups belong to groupA, as in the engines
+            groupB=np.array([self.index[n] for n in set(groupB)-set(groupA)],dtype=np.int64)
+            groupA=np.array([self.index[n] for n in groupA],dtype=np.int64)
+            self.replicas.append((groupA,groupB,replicaSeed))
+
+    #logarithm of the uniform numbers of replica r, in (0,1] so that every delay is finite for p>0
+    def logUniforms(self,r):
+        return np.log1p(-np.random.default_rng(self.replicas[r][2]).random(len(self.indices)))
+
+    #number of nodes in groupA at tMax in replica r when the probability is p, logUniforms being the result of self.logUniforms(r)
+    def final(self,r,p,logUniforms=None):
+        groupA,groupB,replicaSeed=self.replicas[r]
+        if logUniforms is None:
+            logUniforms=self.logUniforms(r)
+        self.evaluations+=1
+        delays=np.maximum(np.ceil(logUniforms/np.log1p(-p)),1) if p<1 else np.ones(len(self.indices))
+        #the nodes of groupB never adopt, so they never transmit either
+        for b in groupB:
+            delays[self.indptr[b]:self.indptr[b+1]]=self.tMax+1
+        distances=dijkstra(csr_array((delays,self.indices,self.indptr),shape=(self.size,self.size)),indices=groupA,min_only=True,limit=self.tMax)
+        reached=np.isfinite(distances)
+        reached[groupB]=False
+        return int(np.count_nonzero(reached))
+
+    #bracket [lower,upper] of the smallest p at which at least cutoff nodes of replica r adopt A, bisected until it is narrower than
+    #tolerance. Both ends are inf if the replica does not reach cutoff even with p=1. The increasing probabilities of guesses (e.g. where
+    #the thresholds of the other replicas lie) are probed first, so that the bisection starts from a narrower bracket
+    def threshold(self,r,cutoff,tolerance=1e-3,guesses=()):
+        if len(self.replicas[r][0])>=cutoff:
+            return 0.0,0.0
+        logUniforms=self.logUniforms(r)
+        lower,upper=0.0,np.inf
+        for p in (*guesses,1.0):
+            if lower<p<upper:
+                if self.final(r,p,logUniforms)>=cutoff:
+                    upper=p
+                    break
+                lower=p
+        if upper==np.inf:
+            return np.inf,np.inf
+        while upper-lower>tolerance:
+            middle=(lower+upper)/2
+            if self.final(r,middle,logUniforms)>=cutoff:
+                upper=middle
+            else:
+                lower=middle
+        return lower,upper
+
+#confidence interval of the q-quantile of a distribution from a sorted sample of it, distribution free: its ends are the order
+#statistics whose ranks bound the binomial(len(sample),q) count of the sample below the quantile
+def quantileInterval(lowerSample,upperSample,q,level=0.95):
+    from scipy import stats
+    size=len(lowerSample)
+    lowerRank=int(stats.binom.ppf((1-level)/2,size,q))
+    upperRank=int(stats.binom.ppf((1+level)/2,size,q))
+    lower=lowerSample[lowerRank-1] if lowerRank>=1 else 0.0
+    upper=upperSample[upperRank] if upperRank<size else np.inf
+    return lower,upper
+
+#estimates the transmission probability at which groupA takes over G: a replica takes over when at least fraction of the nodes adopt A
+#by tMax, and the threshold is the smallest p at which the probability of a takeover reaches level (the median of the thresholds of the
+#replicas for level=0.5). The groups are drawn with seeds(G,forthArgument,fifthArgument,rng) as in batchedExperiments, e.g.
+#exp.halfRandomSeedsB with groupB and sizeGroupA for a vaccination strategy. The threshold is inf if groupA does not take over even with p=1.
+#replicas are added batchSize at a time, each one bisected to tolerance, until the confidence interval of the threshold at confidence
+#is at most targetHalfWidth on either side of the estimate or maxReplicas replicas have been used. Returns a report with the threshold,
+#its confidence interval, the number of replicas and of runs of the dynamics used, whether the target was met, and the bracket
+#of the threshold of every replica
+def findThreshold(seeds,G,tMax,forthArgument,fifthArgument,fraction=0.5,level=0.5,tolerance=1e-3,targetHalfWidth=0.01,batchSize=10,
+                  minReplicas=20,maxReplicas=500,confidence=0.95,seed=None):
+    replicas=CoupledReplicas(G,tMax,seeds,forthArgument,fifthArgument,seed)
+    cutoff=int(np.ceil(fraction*replicas.size))
+    brackets=[]
+    while True:
+        count=min(batchSize,maxReplicas-len(replicas))
+        start=len(replicas)
+        replicas.add(count)
+        #the bisections start from where the thresholds of the replicas so far lie
+        finite=[upper for lower,upper in brackets if upper<np.inf]
+        guesses=tuple(np.quantile(finite,GUESS_QUANTILES)) if len(finite)>=minReplicas//2 else ()
+        brackets.extend(replicas.threshold(r,cutoff,tolerance,guesses) for r in range(start,len(replicas)))
+        lowerEnds=np.sort([lower for lower,upper in brackets])
+        upperEnds=np.sort([upper for lower,upper in brackets])
+        #the q-quantile is the k-th order statistic, between the k-th lower and upper ends of the brackets
+        k=max(int(np.ceil(level*len(brackets))),1)-1
+        estimate=(lowerEnds[k]+upperEnds[k])/2
+        lower,upper=quantileInterval(lowerEnds,upperEnds,level,confidence)
+        #an interval beyond p=1 means that groupA does not take over whatever the probability
+        converged=len(replicas)>=minReplicas and (lower==np.inf or (estimate-lower<=targetHalfWidth and upper-estimate<=targetHalfWidth))
+        print("Replicas:",len(replicas),"threshold:",estimate,"interval:",(lower,upper))
+        if converged or len(replicas)>=maxReplicas:
+            break
+    return {'threshold':float(estimate),
+            'lower':float(lower),
+            'upper':float(upper),
+            'replicas':len(replicas),
+            'runs':replicas.evaluations,
+            'converged':bool(converged),
+            'brackets':brackets}
@@ -1,68 +1,19 @@
 import plotly.graph_objects as go
 import plotly
 import numpy as np
+import engine as en
+import layout as lay
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-def showGraphDynamic(G,data,positions,filename):
-    tMax=len(data)
-    
-    #start initialising the edge trace
-    edge_x = []
-    edge_y = []
-    for edge in G.edges():
-        x0, y0 = positions[edge[0]]
-        x1, y1 = positions[edge[1]]
-        edge_x.append(x0)
-        edge_x.append(x1)
-        edge_x.append(None)
-        edge_y.append(y0)
-        edge_y.append(y1)
-        edge_y.append(None)
-        
-    
-    edge_trace = go.Scatter(
-            x=edge_x, y=edge_y,
-            line=dict(width=1, color='#888'),
-                      hoverinfo='none',
-                      mode='lines')
-    print("Edges trace computed.")
+#colour of the states u, a, and b
+STATE_COLOURS=np.array(['blue','red','green'])
 
-    #construction of the node trace
-    node_x,node_y=zip(*list(positions.values()))
-    node_trace=[]
-    #computation of the list of colour of each node col[n] will be the colour of the nth node in the current frame
-    for t in range(tMax):
-        col=[]
-        for n in G:
-            if G.nodes[n]['state'][t]==1:
-                col.append('red')
-            else:
-                if G.nodes[n]['state'][t]==0:
-                    col.append('blue')
-                else:
-                    col.append('green')
-        #set the attributes the nodes trace sizes, position, colours etc.
-        node_trace.append({
-                'x':node_x, 'y':node_y,
-                'mode':'markers',
-                'hoverinfo':'text',
-                'marker':{
-                        'size':15,
-                        'color':col,
-                        'line_width':3}})
-    print("Nodes trace computed.")
-    
-    #computing the list of frames to be visulaized
-    frames=[{'data':[edge_trace, node_trace[k]],
-                 'layout':{
-                    #change this if you want to change the information visualized at the top of the page 
-                    'title':filename+'<br>U (blue): '+str(data[k][0])+' A (red):'+str(data[k][1])+' B (green): '+str(data[k][2]),
-                    'titlefont_size':16},
-    'name':str(k)} 
-    for k in range(tMax)]
-    
-    
-    print("Frames computed.")
-    
+#slider and play/pause buttons of the animations of showGraphDynamic over tMax frames
+#with replay=True the step k of the slider plays the frames 0..k instead of jumping to frame k, for frames that only carry what changed
+def dynamicLayout(tMax,replay=False):
     #initialization of the sliders that are shown under the simulation 
     sliders = [
                 {
@@ -72,7 +23,7 @@ def showGraphDynamic(G,data,positions,filename):
                     "y": 0,
                     "steps": [
                         {
-                            "args": [[str(k)], {
+                            "args": [[str(j) for j in range(k+1)] if replay else [str(k)], {
                 "frame": {"duration": 0},
                 "mode": "immediate",
                 "fromcurrent": True,
@@ -125,21 +76,116 @@ def showGraphDynamic(G,data,positions,filename):
              ],
             'sliders':sliders
             }
+    return layout
 
+#builds the animated figure of the dynamics on G without rendering it
+#history is the AdoptionHistory of the run, if it is not given it is read from the attributes written on G by en.graphModelRun
+#positions maps every node to its (x,y), if it is None the layout is computed (or read from the cache) by layout.positions
+#mode 'full' stores the colour of every node in every frame, mode 'delta' draws with WebGL and only stores the nodes that change (see deltaDynamicFigure)
+def graphDynamicFigure(G,data,positions,filename,history=None,mode='full'):
+    tMax=len(data)
+    if history is None:
+        history=en.AdoptionHistory.fromGraph(G,tMax-1)
+    if positions is None:
+        positions=lay.positions(G)
+    if mode=='delta':
+        return deltaDynamicFigure(G,data,positions,filename,history)
+    if mode!='full':
+        raise ValueError("Unknown mode: "+str(mode))
+    
+    #start initialising the edge trace
+    edge_x,edge_y=lay.edgeCoordinates(G,positions)
+    
+    edge_trace = go.Scatter(
+            x=edge_x, y=edge_y,
+            line=dict(width=1, color='#888'),
+                      hoverinfo='none',
+                      mode='lines')
+    print("Edges trace computed.")
+
+    #construction of the node trace, in the order of the nodes of history as the colours
+    node_x,node_y=zip(*[positions[n] for n in history.nodes])
+    node_trace=[]
+    #computation of the list of colour of each node col[n] will be the colour of the nth node in the current frame
+    for t in range(tMax):
+        col=STATE_COLOURS[history.stateAt(t)].tolist()
+        #set the attributes the nodes trace sizes, position, colours etc.
+        node_trace.append({
+                'x':node_x, 'y':node_y,
+                'mode':'markers',
+                'hoverinfo':'text',
+                'marker':{
+                        'size':15,
+                        'color':col,
+                        'line_width':3}})
+    print("Nodes trace computed.")
+    
+    #computing the list of frames to be visulaized
+    frames=[{'data':[edge_trace, node_trace[k]],
+                 'layout':{
+                    #change this if you want to change the information visualized at the top of the page 
+                    'title':filename+'<br>U (blue): '+str(data[k][0])+' A (red):'+str(data[k][1])+' B (green): '+str(data[k][2]),
+                    'titlefont_size':16},
+    'name':str(k)} 
+    for k in range(tMax)]
+    
+    
+    print("Frames computed.")
+    
+    layout=dynamicLayout(tMax)
     fig = {'data':[edge_trace, node_trace[0]],
                  'layout':layout,
     'frames':frames}
     
     print("Figure generated.")             
-                
-    
+    return fig
+
+#WebGL version of the animation whose size grows with the number of adoptions instead of N*tMax: the nodes are drawn once
+#in their initial colour, and the nodes that adopted A at step s are drawn once more in red, in a layer that each frame only shows or hides.
+#the layers are computed in a single pass over the adoption times of history
+def deltaDynamicFigure(G,data,positions,filename,history):
+    tMax=len(data)
+    coordinates=np.array([positions[n] for n in history.nodes],dtype=float).reshape(-1,2)
+    edge_x,edge_y=lay.edgeCoordinates(G,positions)
+    edge_trace={'type':'scattergl','x':edge_x,'y':edge_y,'mode':'lines','line':{'width':1,'color':'#888'},'hoverinfo':'none'}
+    node_trace={'type':'scattergl','x':coordinates[:,0],'y':coordinates[:,1],'mode':'markers','hoverinfo':'text',
+                'marker':{'size':15,'color':STATE_COLOURS[history.stateAt(0)],'line_width':3}}
+    #nodes grouped by adoption step, only the steps 1..tMax-1 in which some node adopted get a layer
+    order=np.argsort(history.times,kind='stable')
+    times=history.times[order]
+    steps=np.unique(times[(times>=1)&(times<tMax)])
+    starts,ends=np.searchsorted(times,steps,'left'),np.searchsorted(times,steps,'right')
+    layers=[{'type':'scattergl','x':coordinates[order[i:j],0],'y':coordinates[order[i:j],1],
+             'mode':'markers','hoverinfo':'text','visible':False,'marker':{'size':15,'color':'red','line_width':3}}
+            for i,j in zip(starts,ends)]
+    print("Nodes trace computed.")
+    #frame 0 hides every layer, frame k only shows the layer of the nodes that adopted at step k, so the frames carry O(tMax+layers)
+    #visibility flags in all; the slider replays the frames 0..k (see dynamicLayout) to reach the state of step k from any other one
+    layerOf={int(s):2+i for i,s in enumerate(steps)}
+    changed=[list(range(2,2+steps.size))]+[[layerOf[k]] if k in layerOf else [] for k in range(1,tMax)]
+    frames=[{'data':[{'visible':k>0} for trace in changed[k]],
+             'traces':changed[k],
+             'layout':{
+                'title':filename+'<br>U (blue): '+str(data[k][0])+' A (red):'+str(data[k][1])+' B (green): '+str(data[k][2]),
+                'titlefont_size':16},
+             'name':str(k)}
+            for k in range(tMax)]
+    print("Frames computed.")
+    fig={'data':[edge_trace,node_trace]+layers,'layout':dynamicLayout(tMax,replay=True),'frames':frames}
+    print("Figure generated.")
+    return fig
+
+#renders the animation of the dynamics on G to filename_graph.html and opens it, see graphDynamicFigure
+#use mode='delta' for graphs with more than a few thousand nodes
+def showGraphDynamic(G,data,positions,filename,history=None,mode='full'):
+    fig=graphDynamicFigure(G,data,positions,filename,history,mode)
     print("Visualization rendering done")
     plotly.offline.plot(fig, filename=filename+"_graph.html", auto_open=True, validate=False)
     print("File saved.")
 
 
-
-def showData(data,filename):
+#builds the animated plot of data (number of nodes in state u, a, and b at each step) without rendering it
+def dataFigure(data,filename):
     data=np.array(data)
     t=list(range(len(data)))
     #slice the coloumns of the given matrix (note that the input is just a matrix 3Xn)
@@ -233,20 +279,9 @@ def showData(data,filename):
                 }
              ],
             'sliders':sliders},
-        #initialization of the frame list
+        #initialization of the frame list, the lines never change so every frame only moves the three markers (traces 3, 4, and 5)
         'frames':[{
-            'data':[{'x':t, 'y':y,
-                         'mode':"lines",
-                         'name':"U",
-                         'line':{'width':2, 'color':"blue"}},
-                {'x':t, 'y':y1,
-                         'mode':"lines",
-                         'name':"A",
-                         'line':{'width':2, 'color':"red"}},
-                {'x':t, 'y':y2,
-                         'name':"B",
-                         'mode':"lines",
-                         'line':{'width':2, 'color':"green"}},
+            'data':[
                 {
                 'x':[k],
                 'y':[data[k][0]],
@@ -264,12 +299,40 @@ def showData(data,filename):
                 'name':"B at t",
                 'marker':{'color':"green", 'size':10}}
                 ],
+            'traces':[3,4,5],
             'layout':{
                     'title':filename+" Model Data",
                     'titlefont_size':16},
             'name':str(k)}          
             for k in range(len(t))],
     }
+    return fig
+
+#renders the evolution of the number of nodes in state u, a, and b to filename_data.html and opens it, see dataFigure
+def showData(data,filename):
+    fig=dataFigure(data,filename)
     plotly.offline.plot(fig, filename=filename+"_data.html", auto_open=True, validate=False)
 
+#worker of exportData, writes the plot of one scenario without opening it
+def writeData(task):
+    data,filename,includePlotlyJS=task
+    plotly.offline.plot(dataFigure(data,filename), filename=filename+"_data.html", auto_open=False, validate=False, include_plotlyjs=includePlotlyJS)
+    return filename+"_data.html"
 
+#headless batch version of showData: writes the plot of every scenario of the dictionary filename->data in workers processes
+#(all the cores by default) without opening a browser, and returns the list of files written
+#with includePlotlyJS='directory' the files share a single plotly.min.js next to them instead of embedding a copy each
+#the plots are written in this process when workers is 1, when this process is itself a worker (a pool started there would be
+#started again by every worker of a spawned pool), or when the pool breaks, e.g. because the script that called exportData
+#re-runs itself in the workers for lack of an if __name__=='__main__': guard
+def exportData(scenarios,workers=None,includePlotlyJS='directory'):
+    tasks=[(data,filename,includePlotlyJS) for filename,data in scenarios.items()]
+    workers=min(workers or os.cpu_count(),len(tasks))
+    if workers<=1 or multiprocessing.parent_process() is not None:
+        return [writeData(task) for task in tasks]
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            return list(pool.map(writeData,tasks))
+    except BrokenProcessPool:
+        print("Export: the worker processes failed, writing the plots in this process.")
+        return [writeData(task) for task in tasks]